@@ -0,0 +1,101 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+
+class BlobWriter:
+    """Write-only file handle that hashes what it writes and files it into the store on commit"""
+
+    def __init__(self, store):
+        self.store = store
+        self.hash = hashlib.sha256()
+        self.size = 0
+        fd, self.temp_path = tempfile.mkstemp(dir=store.tmp_dir)
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self.hash.update(chunk)
+        self.size += len(chunk)
+        self.file.write(chunk)
+
+    def commit(self, url=None):
+        """Move the blob into place (unless an identical one exists) and return its digest"""
+        self.file.close()
+        digest = self.hash.hexdigest()
+        object_path = self.store.object_path(digest)
+        if os.path.exists(object_path):
+            os.remove(self.temp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # mkstemp creates owner-only files; mirrored assets should be world-readable
+            os.chmod(self.temp_path, 0o644)
+            os.replace(self.temp_path, object_path)
+        if url:
+            self.store.record(url, digest, self.size)
+        return digest
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class AssetStore:
+    """Content-addressed blob store with a URL -> SHA-256 index.
+
+    Blobs live under `root/objects/ab/abcdef...`, so each unique byte string
+    is stored once no matter how many URLs or mirrors refer to it. Mirror
+    trees get hardlinks (or copies where linking is impossible) to the blobs.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL)'
+        )
+        self._db.commit()
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def lookup(self, url):
+        """Return the digest stored for url if its blob is still present, else None"""
+        with self._lock:
+            row = self._db.execute('SELECT digest FROM urls WHERE url = ?', (url,)).fetchone()
+        if row and os.path.exists(self.object_path(row[0])):
+            return row[0]
+        return None
+
+    def record(self, url, digest, size):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO urls (url, digest, size) VALUES (?, ?, ?)', (url, digest, size))
+            self._db.commit()
+
+    def writer(self):
+        return BlobWriter(self)
+
+    def link(self, digest, dest_path):
+        """Make dest_path refer to the blob: hardlink if possible, copy otherwise"""
+        object_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+        if os.path.exists(dest_path):
+            if os.path.samefile(object_path, dest_path):
+                return
+            os.remove(dest_path)
+        try:
+            os.link(object_path, dest_path)
+        except OSError:
+            shutil.copyfile(object_path, dest_path)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
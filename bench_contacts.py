@@ -0,0 +1,104 @@
+"""Micro-benchmark contact extraction: old get_text() + regex scan vs contacts.py.
+
+Usage: python bench_contacts.py [CORPUS_DIR] [--repeat 5]
+
+CORPUS_DIR is searched recursively for saved *.html pages (a WebsiteScraper
+mirror works). Without it, a synthetic script-heavy corpus is generated.
+Pages are parsed once up front; only extraction CPU time is measured.
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from contacts import extract_contacts
+
+
+def legacy_extract(soup):
+    """The pre-contacts.py extraction from extract_company_info"""
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b'
+    text_content = soup.get_text()
+    emails = re.findall(email_pattern, text_content)
+    business_emails = [e for e in emails if not any(x in e.lower() for x in ['example.com', 'test.com', 'sentry.io'])]
+    email = business_emails[0] if business_emails else None
+
+    phone = None
+    for pattern in [r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}']:
+        phones = re.findall(pattern, text_content)
+        if phones:
+            phone = phones[0]
+            break
+    return email, phone
+
+
+def synthetic_corpus(count=50, seed=0):
+    """Script-heavy pages; about half carry mailto:/tel: links near the top"""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        scripts = ''.join(f'<script>var data{j} = "{"x" * 2000}";</script>' for j in range(rng.randint(20, 80)))
+        paragraphs = ''.join(f'<p>{"Lorem ipsum dolor sit amet " * 20}</p>' for _ in range(rng.randint(50, 200)))
+        contact = (f'<a href="mailto:hello@company{i}.com">Email</a><a href="tel:+1-555-010-{i:04d}">Call</a>'
+                   if i % 2 else '')
+        footer = f'<footer>Write to info@company{i}.com or call (555) 010-{i:04d}</footer>'
+        pages.append(f'<html><head>{scripts}</head><body><header>{contact}</header>{paragraphs}{footer}</body></html>')
+    return pages
+
+
+def load_corpus(directory):
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.html', '.htm')):
+                with open(os.path.join(root, name), encoding='utf-8', errors='replace') as f:
+                    pages.append(f.read())
+    return pages
+
+
+def per_page_cpu(extract, soups, repeat):
+    """Best-of-repeat CPU seconds for each page"""
+    timings = []
+    for soup in soups:
+        best = None
+        for _ in range(repeat):
+            start = time.process_time()
+            extract(soup)
+            elapsed = time.process_time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', nargs='?', help='directory of saved HTML pages')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per page (best is kept)')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not pages:
+        print(f"No .html files found under {args.corpus}")
+        return
+    soups = [BeautifulSoup(page, 'html.parser') for page in pages]
+    print(f"{len(soups)} pages, {sum(len(p) for p in pages) / 1024 / 1024:.1f} MB of HTML\n")
+
+    before = per_page_cpu(legacy_extract, soups, args.repeat)
+    after = per_page_cpu(extract_contacts, soups, args.repeat)
+    agree = sum(legacy_extract(s) == extract_contacts(s) for s in soups)
+
+    print(f"{'':<12}{'mean ms':>10}{'median ms':>11}{'p95 ms':>9}")
+    for name, timings in (('before', before), ('after', after)):
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        print(f"{name:<12}{statistics.mean(timings) * 1000:>10.2f}"
+              f"{statistics.median(timings) * 1000:>11.2f}{p95 * 1000:>9.2f}")
+    print(f"\nSpeedup (total CPU): {sum(before) / max(sum(after), 1e-9):.1f}x")
+    print(f"Identical (email, phone) on {agree}/{len(soups)} pages "
+          f"(the rest prefer a mailto:/tel: link or JSON-LD over the first text match)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark WebsiteScraper's HTML handling: old two-parse pipeline vs single pass.
+
+Usage: python bench_parse.py [--sizes 1,4,8] [--repeat 3]
+
+Fixture pages are generated in memory (sizes in MB) with a realistic mix of
+stylesheets, scripts, images, anchors and body text.
+"""
+import argparse
+import random
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from htmlrefs import PARSER, PageResources
+
+BASE_URL = 'https://example.com/'
+
+
+def make_fixture(size_mb, seed=0):
+    """Build an HTML page of roughly size_mb megabytes"""
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit']
+    head = ['<html><head><title>Fixture</title>']
+    head += [f'<link rel="stylesheet" href="/css/style{i}.css">' for i in range(40)]
+    head += [f'<script src="/js/app{i}.js"></script>' for i in range(40)]
+    head.append('<style>body { margin: 0 }</style><script>var inline = 1;</script></head><body>')
+
+    body = []
+    size = sum(len(part) for part in head)
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        text = ' '.join(rng.choice(words) for _ in range(60))
+        block = (f'<section id="s{i}"><h2>Heading {i}</h2><p>{text}</p>'
+                 f'<img src="/images/img{i % 500}.png" alt="x"><a href="/page{i}.html">Page {i}</a></section>')
+        body.append(block)
+        size += len(block)
+        i += 1
+    return ''.join(head + body + ['</body></html>'])
+
+
+def local_map(urls, prefix):
+    return {url: f"{prefix}/{url.rsplit('/', 1)[-1]}" for url in urls}
+
+
+def legacy_pipeline(html):
+    """The pre-single-pass flow: parse, walk once per asset type, then re-parse and re-walk to rewrite"""
+    soup = BeautifulSoup(html, 'html.parser')
+    css = [urljoin(BASE_URL, l.get('href')) for l in soup.find_all('link', {'rel': 'stylesheet'}) if l.get('href')]
+    css += [('inline', s.string) for s in soup.find_all('style') if s.string]
+    js = [urljoin(BASE_URL, s.get('src')) for s in soup.find_all('script', {'src': True}) if s.get('src')]
+    js += [('inline', s.string) for s in soup.find_all('script') if s.string and not s.get('src')]
+    images = [urljoin(BASE_URL, i.get('src')) for i in soup.find_all('img') if i.get('src')]
+
+    css_files = local_map([c for c in css if not isinstance(c, tuple)], 'css')
+    js_files = local_map([j for j in js if not isinstance(j, tuple)], 'js')
+    image_files = local_map(images, 'images')
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag, attr, files in (('link', 'href', css_files), ('script', 'src', js_files), ('img', 'src', image_files)):
+        for element in soup.find_all(tag):
+            value = element.get(attr)
+            if value and urljoin(BASE_URL, value) in files:
+                element[attr] = files[urljoin(BASE_URL, value)]
+    return str(soup)
+
+
+def single_pass_pipeline(html, parser):
+    """The current flow: one parse, one traversal into a template, then fill in the local paths"""
+    resources = PageResources(BeautifulSoup(html, parser), BASE_URL)
+    local_paths = {'css': local_map(resources.css_links()[:len(resources.css)], 'css'),
+                   'js': local_map(resources.js_links()[:len(resources.js)], 'js'),
+                   'images': local_map(resources.image_links(), 'images'), 'media': {}}
+    styles = [None] * len(resources.styles)
+    return resources.template().fill(local_paths, styles)
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,4,8', help='fixture sizes in MB, comma separated')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    pipelines = [('legacy (html.parser x2)', legacy_pipeline),
+                 ('single pass (html.parser)', lambda html: single_pass_pipeline(html, 'html.parser'))]
+    if PARSER != 'html.parser':
+        pipelines.append((f'single pass ({PARSER})', lambda html: single_pass_pipeline(html, PARSER)))
+
+    print(f"{'size':>6}  {'pipeline':<28}{'seconds':>9}{'speedup':>9}")
+    for size in (float(s) for s in args.sizes.split(',')):
+        html = make_fixture(size)
+        baseline = None
+        for name, pipeline in pipelines:
+            seconds = best_of(lambda: pipeline(html), args.repeat)
+            baseline = baseline or seconds
+            print(f"{size:>4.0f}MB  {name:<28}{seconds:>9.3f}{baseline / seconds:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
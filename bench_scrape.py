@@ -0,0 +1,174 @@
+"""End-to-end offline benchmark of both scrapers against local fixture servers.
+
+Usage: python bench_scrape.py [--companies 40] [--latency-ms 50] [--page-kb 30]
+                              [--assets 20] [--asset-kb 50] [--error-rate 0.05] [--warm]
+                              [--stall-rate 0.02] [--stall-ms 5000] [--parse-workers N]
+                              [--retries 2] [--no-hedge]
+
+WebDevScraper.scrape_city runs against the fake Bing/DuckDuckGo pages and
+company sites from fixture_server.py; WebsiteScraper.scrape_website mirrors
+the first company site with all of its assets. Each scenario runs in its
+own process with fresh cache, journal and index files, so its peak RSS is
+its own. --warm runs every scenario a second time on the same state.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from fixture_server import FixtureConfig, start_in_process
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed(func, latencies):
+    """Wrap func so each call's wall time lands in latencies"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def run_city(ports, workdir, companies, options):
+    from scrapper import WebDevScraper
+    from search import BingProvider, DuckDuckGoProvider
+    from sinks import JsonlSink
+
+    bing_port, ddg_port, _ = ports
+    scraper = WebDevScraper(cache_dir=os.path.join(workdir, 'http_cache'),
+                            journal_path=os.path.join(workdir, 'journal.sqlite'),
+                            search_cache_path=os.path.join(workdir, 'search.sqlite'),
+                            dedupe_path=None, metrics_path=None, keep_results=False, **options)
+    scraper.search.providers = {
+        'bing': BingProvider(f'http://127.0.0.1:{bing_port}/search'),
+        'duckduckgo': DuckDuckGoProvider(f'http://127.0.0.1:{ddg_port}/html/'),
+    }
+    latencies = []
+    scraper.extract_company_info = timed(scraper.extract_company_info, latencies)
+
+    with JsonlSink(os.path.join(workdir, 'companies.jsonl')) as sink:
+        start = time.perf_counter()
+        scraper.scrape_city('Benchville', 'all', num_results=companies, sink=sink)
+        elapsed = time.perf_counter() - start
+    # A forked scenario process exits without running the executor's atexit hook
+    scraper.parser.close()
+    return elapsed, len(latencies), latencies, scraper.metrics.summary()
+
+
+def run_site(ports, workdir, companies, options):
+    spec = importlib.util.spec_from_file_location('web_scrapper', os.path.join(os.path.dirname(__file__),
+                                                                                'web-scrapper.py'))
+    web_scrapper = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(web_scrapper)
+    logging.disable(logging.CRITICAL)
+
+    site_port = ports[2][0]
+    scraper = web_scrapper.WebsiteScraper(f'http://127.0.0.1:{site_port}/', os.path.join(workdir, 'mirror'),
+                                          **options)
+    latencies = []
+    scraper.download_file = timed(scraper.download_file, latencies)
+
+    start = time.perf_counter()
+    scraper.scrape_website()
+    elapsed = time.perf_counter() - start
+    scraper.downloader.close()
+    scraper.parser.close()
+    # The page itself plus every asset download
+    return elapsed, len(latencies) + 1, latencies, scraper.metrics.summary()
+
+
+SCENARIOS = {'scrape_city': run_city, 'scrape_website': run_site}
+
+
+def _run_scenario(name, ports, workdir, companies, options, runs, results):
+    outcome = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            elapsed, items, latencies, summary = SCENARIOS[name](ports, workdir, companies, options)
+            outcome.append({
+                'elapsed': elapsed,
+                'items': items,
+                'latencies': latencies,
+                'bytes': summary['bytes_total'],
+                'errors': sum(n for codes in summary['status_per_host'].values()
+                              for code, n in codes.items() if code.startswith('5'))
+                          + sum(n for errors in summary['errors_per_host'].values() for n in errors.values()),
+            })
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((outcome, peak_rss))
+
+
+def run_isolated(name, ports, companies, options, runs):
+    """Run a scenario in a fresh process and temp dir; returns (per-run outcomes, peak RSS MB)"""
+    results = multiprocessing.Queue()
+    with tempfile.TemporaryDirectory(prefix=f'bench_{name}_') as workdir:
+        process = multiprocessing.Process(target=_run_scenario,
+                                          args=(name, ports, workdir, companies, options, runs, results))
+        process.start()
+        outcome = results.get()
+        process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--companies', type=int, default=40, help='company sites (and search results)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='mean server latency per response')
+    parser.add_argument('--page-kb', type=int, default=30, help='landing page size')
+    parser.add_argument('--assets', type=int, default=20, help='CSS/JS/image assets per landing page')
+    parser.add_argument('--asset-kb', type=int, default=50, help='size of each asset')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of company responses that fail')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='share of company responses that hang')
+    parser.add_argument('--stall-ms', type=float, default=5000, help='how long a hanging response takes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--warm', action='store_true', help='repeat each scenario on its warm cache')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='parse processes (default: one per core, 0: parse in-thread)')
+    parser.add_argument('--retries', type=int, default=2, help='retries per failed request (0 for none)')
+    parser.add_argument('--no-hedge', action='store_true', help='never send a hedged second request')
+    args = parser.parse_args()
+
+    config = FixtureConfig(args.companies, args.latency_ms, args.page_kb, args.assets, args.asset_kb,
+                           args.error_rate, args.seed, args.stall_rate, args.stall_ms)
+    options = {'parse_workers': args.parse_workers, 'retries': args.retries,
+               'hedge_quantile': None if args.no_hedge else 0.95}
+    server, ports = start_in_process(config)
+    print(f"{args.companies} company sites, {args.latency_ms:g} ms latency, {args.page_kb} KB pages, "
+          f"{args.assets} x {args.asset_kb} KB assets, {args.error_rate:.0%} errors, "
+          f"{args.stall_rate:.0%} stalls of {args.stall_ms:g} ms\n")
+
+    print(f"{'scenario':<22}{'items':>6}{'wall s':>8}{'items/s':>9}{'MB/s':>7}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'errors':>7}{'peak RSS MB':>13}")
+    try:
+        for name in SCENARIOS:
+            outcome, peak_rss = run_isolated(name, ports, args.companies, options, 2 if args.warm else 1)
+            for run, result in enumerate(outcome):
+                label = name + (' (warm)' if run else '')
+                latencies = [t * 1000 for t in result['latencies']]
+                print(f"{label:<22}{result['items']:>6}{result['elapsed']:>8.2f}"
+                      f"{result['items'] / result['elapsed']:>9.1f}"
+                      f"{result['bytes'] / 1024 / 1024 / result['elapsed']:>7.1f}"
+                      f"{statistics.median(latencies) if latencies else 0:>8.0f}"
+                      f"{percentile(latencies, 0.99):>8.0f}{result['errors']:>7}{peak_rss:>13.1f}")
+    finally:
+        server.terminate()
+    print("\nLatency is per company for scrape_city and per asset download for scrape_website.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import json
+import re
+from urllib.parse import urljoin, urlparse
+
+from bs4 import Comment, NavigableString, Tag
+
+# One pass over each text node finds either an email or a phone number
+CONTACT_PATTERN = re.compile(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}\b)'
+    r'|(?P<phone>\+?(?:\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})'
+)
+EMAIL_SCAN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}\b')
+PHONE_SCAN = re.compile(r'\+?(?:\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+EMAIL_PATTERN = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}$')
+# Text with fewer than 7 digits cannot hold a phone number
+DIGITS = re.compile(r'(?:\d\D*){7}')
+
+IGNORED_EMAIL_PARTS = ('example.com', 'test.com', 'sentry.io')
+# Retina asset names like logo@2x.png look like addresses
+IGNORED_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+INVISIBLE_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe'}
+
+# Link keywords that point at pages likely to list contact details, with their priority
+CONTACT_PAGE_KEYWORDS = [
+    ('contact', 3), ('kontakt', 3), ('get-in-touch', 3), ('reach-us', 3),
+    ('impressum', 2), ('imprint', 2), ('about', 2), ('team', 1),
+]
+
+
+def is_business_email(email):
+    email = email.lower()
+    return not any(part in email for part in IGNORED_EMAIL_PARTS) and not email.endswith(IGNORED_EMAIL_SUFFIXES)
+
+
+class ContactExtractor:
+    """Find a page's email address and phone number in a single walk of its tree.
+
+    mailto:/tel: links and schema.org JSON-LD are trusted and end the walk as
+    soon as both fields are known from them. Visible text nodes are scanned
+    with one combined pattern, and only while a field is still missing; a
+    text match is kept as a fallback in case nothing trusted turns up.
+    """
+
+    def __init__(self):
+        self.email = None
+        self.phone = None
+        self.text_email = None
+        self.text_phone = None
+
+    def _set_email(self, value):
+        value = value.strip()
+        if not self.email and EMAIL_PATTERN.match(value) and is_business_email(value):
+            self.email = value
+
+    def _set_phone(self, value):
+        value = value.strip()
+        if not self.phone and sum(c.isdigit() for c in value) >= 7:
+            self.phone = value
+
+    def _confident(self):
+        return bool(self.email and self.phone)
+
+    def _json_ld(self, text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                if isinstance(item.get('email'), str):
+                    self._set_email(item['email'].replace('mailto:', ''))
+                if isinstance(item.get('telephone'), str):
+                    self._set_phone(item['telephone'])
+                stack.extend(v for v in item.values() if isinstance(v, (list, dict)))
+
+    def _text(self, text):
+        # Cheap substring checks decide which patterns can match at all
+        need_email = not (self.email or self.text_email) and '@' in text
+        need_phone = not (self.phone or self.text_phone) and DIGITS.search(text) is not None
+        if not (need_email or need_phone):
+            return
+        if not need_phone:
+            self._text_email(EMAIL_SCAN.finditer(text))
+            return
+        if not need_email:
+            match = PHONE_SCAN.search(text)
+            if match:
+                self.text_phone = match.group()
+            return
+        for match in CONTACT_PATTERN.finditer(text):
+            email, phone = match.group('email'), match.group('phone')
+            if email and not self.text_email and is_business_email(email):
+                self.text_email = email
+            elif phone and not self.text_phone:
+                self.text_phone = phone
+            if self.text_email and self.text_phone:
+                break
+
+    def _text_email(self, matches):
+        for match in matches:
+            if is_business_email(match.group()):
+                self.text_email = match.group()
+                return
+
+    def feed(self, soup):
+        """Walk the tree (skipping invisible subtrees) until both fields are trusted"""
+        stack = [soup]
+        while stack and not self._confident():
+            node = stack.pop()
+            if isinstance(node, Tag):
+                name = node.name
+                if name == 'a':
+                    href = node.get('href') or ''
+                    if href[:7].lower() == 'mailto:':
+                        self._set_email(href[7:].split('?')[0])
+                    elif href[:4].lower() == 'tel:':
+                        self._set_phone(href[4:])
+                elif name == 'script' and (node.get('type') or '').lower() == 'application/ld+json':
+                    if node.string:
+                        self._json_ld(node.string)
+                    continue
+                if name in INVISIBLE_TAGS:
+                    continue
+                stack.extend(reversed(node.contents))
+            elif isinstance(node, NavigableString) and not isinstance(node, Comment):
+                self._text(node)
+        return self
+
+    def result(self):
+        """(email, phone), preferring trusted values over text matches; None when missing"""
+        return self.email or self.text_email, self.phone or self.text_phone
+
+
+def extract_contacts(soup):
+    """Return (email, phone) found on a parsed page; either may be None"""
+    return ContactExtractor().feed(soup).result()
+
+
+def rank_contact_links(soup, page_url, limit):
+    """Return up to `limit` same-site contact/about links, most promising first"""
+    site = urlparse(page_url).netloc.lower().removeprefix('www.')
+    scored = {}
+
+    for anchor in soup.find_all('a', href=True):
+        url = urljoin(page_url, anchor['href']).split('#')[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower().removeprefix('www.') != site:
+            continue
+        if url.rstrip('/') == page_url.split('#')[0].rstrip('/'):
+            continue
+
+        haystack = f"{parsed.path} {anchor.get_text(' ', strip=True)}".lower()
+        score = max((weight for keyword, weight in CONTACT_PAGE_KEYWORDS if keyword in haystack), default=0)
+        if score > scored.get(url, 0):
+            scored[url] = score
+
+    ranked = sorted(scored, key=scored.get, reverse=True)
+    return ranked[:limit]
@@ -0,0 +1,49 @@
+import re
+from urllib.parse import urljoin
+
+# url(...) with or without quotes, and @import "..." without url()
+CSS_URL = re.compile(r'''url\(\s*(?P<quote>["']?)(?P<url>[^"')]*?)(?P=quote)\s*\)''', re.IGNORECASE)
+CSS_IMPORT = re.compile(r'''@import\s+(?P<quote>["'])(?P<url>[^"']+)(?P=quote)''', re.IGNORECASE)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico', '.bmp'}
+FONT_EXTENSIONS = {'.woff', '.woff2', '.ttf', '.otf', '.eot'}
+
+
+def _skip(url):
+    # Inline data, same-document SVG references and empty values have nothing to fetch
+    return not url or url.startswith(('data:', '#', 'about:', 'javascript:'))
+
+
+def css_references(text, base_url):
+    """(absolute URL, is_import) for every url() and @import in a stylesheet, in order, without duplicates"""
+    text = CSS_COMMENT.sub('', text)
+    refs = {}
+    for match in CSS_IMPORT.finditer(text):
+        url = match.group('url').strip()
+        if not _skip(url):
+            refs.setdefault(urljoin(base_url, url).split('#')[0], True)
+    for match in CSS_URL.finditer(text):
+        url = match.group('url').strip()
+        if not _skip(url):
+            is_import = text[max(0, match.start() - 32):match.start()].rstrip().lower().endswith('@import')
+            refs.setdefault(urljoin(base_url, url).split('#')[0], is_import)
+    return list(refs.items())
+
+
+def rewrite_css(text, base_url, local_paths):
+    """Replace url() and @import targets found in local_paths (absolute URL -> path); fragments are kept"""
+    def replace(match, wrap):
+        url = match.group('url').strip()
+        if _skip(url):
+            return match.group(0)
+        full_url, _, fragment = urljoin(base_url, url).partition('#')
+        local_path = local_paths.get(full_url)
+        if not local_path:
+            return match.group(0)
+        if fragment:
+            local_path = f"{local_path}#{fragment}"
+        return wrap(local_path)
+
+    text = CSS_IMPORT.sub(lambda m: replace(m, lambda path: f'@import "{path}"'), text)
+    return CSS_URL.sub(lambda m: replace(m, lambda path: f'url("{path}")'), text)
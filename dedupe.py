@@ -0,0 +1,155 @@
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from frontier import normalize_url
+
+try:
+    import tldextract
+    # Bundled suffix list only; never fetch it over the network mid-scrape. Its
+    # private section makes each site on a hosting platform a domain of its own
+    _extract = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True)
+except ImportError:
+    _extract = None
+
+# Query parameters that only identify the campaign or click, not the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', '_ga', '_hsenc', '_hsmi'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Second-level labels under which registrations happen (used without tldextract)
+SECOND_LEVEL_LABELS = {'co', 'com', 'net', 'org', 'gov', 'edu', 'ac', 'or', 'ne', 'go', 'gob', 'nic', 'ltd', 'plc'}
+
+# Hosting platforms whose customers each get a subdomain (private suffixes of the
+# Public Suffix List; used without tldextract)
+HOSTING_SUFFIXES = {
+    'wixsite.com', 'github.io', 'gitlab.io', 'myshopify.com', 'blogspot.com', 'herokuapp.com', 'netlify.app',
+    'vercel.app', 'pages.dev', 'web.app', 'firebaseapp.com', 'appspot.com', 'azurewebsites.net', 'weebly.com',
+    'webflow.io', 'business.site', 'myportfolio.com', 'readthedocs.io',
+}
+
+NON_DIGITS = re.compile(r'\D')
+
+
+def canonical_url(url):
+    """URL identity for deduplication: normalized, without www., tracking parameters or scheme differences"""
+    parts = urlsplit(normalize_url(url))
+    host = parts.netloc.removeprefix('www.')
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, query, ''))
+
+
+def registrable_domain(url):
+    """The domain a company registered (example.co.uk for https://www.shop.example.co.uk/x).
+
+    Sites on a hosting platform count as registered on their own
+    subdomain (acme.github.io, not github.io), so unrelated customers of
+    one platform are never taken for the same company.
+    """
+    parts = urlsplit(url.strip() if '//' in url else f"//{url.strip()}")
+    host = (parts.hostname or '').lower().rstrip('.')
+    if not host or host.replace('.', '').isdigit() or ':' in host or host == 'localhost':
+        # Addresses have no registrable part; the port tells local sites apart
+        return f"{host}:{parts.port}" if parts.port else host
+    if _extract is not None:
+        extracted = _extract(host)
+        if extracted.domain and extracted.suffix:
+            return f"{extracted.domain}.{extracted.suffix}"
+    labels = host.split('.')
+    if len(labels) > 2 and '.'.join(labels[-2:]) in HOSTING_SUFFIXES:
+        return '.'.join(labels[-3:])
+    if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def normalize_email(email):
+    if not email or email == 'N/A' or '@' not in email:
+        return None
+    return email.strip().lower()
+
+
+def normalize_phone(phone):
+    """Digits only; numbers with a country code are compared on their last ten digits"""
+    if not phone or phone == 'N/A':
+        return None
+    digits = NON_DIGITS.sub('', phone)
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+
+class DedupeIndex:
+    """Persistent index of scraped companies by registrable domain, email and phone.
+
+    Domains are checked before fetching so a company already scraped in an
+    earlier run (under any URL variant) is not downloaded again. Extracted
+    records are matched by email and phone as well, which catches the same
+    company listed under a second domain.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS companies (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            url TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            PRIMARY KEY (kind, key)
+        )''')
+        self._db.commit()
+
+    def has_domain(self, url):
+        domain = registrable_domain(url)
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM companies WHERE kind = 'domain' AND key = ?",
+                                    (domain,)).fetchone() is not None
+
+    def keys(self, record):
+        """(kind, key) pairs a record is indexed under"""
+        keys = [('domain', registrable_domain(record['url']))]
+        email = normalize_email(record.get('email'))
+        if email:
+            keys.append(('email', email))
+        phone = normalize_phone(record.get('phone'))
+        if phone:
+            keys.append(('phone', phone))
+        return keys
+
+    def add(self, record):
+        """Index a record; return the URL of the earlier record it duplicates, or None if it is new"""
+        keys = self.keys(record)
+        with self._lock:
+            duplicate_of = None
+            for kind, key in keys:
+                row = self._db.execute('SELECT url FROM companies WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+                if row:
+                    duplicate_of = row[0]
+                    break
+            self._db.executemany('INSERT OR IGNORE INTO companies (kind, key, url, first_seen) VALUES (?, ?, ?, ?)',
+                                 [(kind, key, duplicate_of or record['url'], time.time()) for kind, key in keys])
+            self._db.commit()
+        return duplicate_of
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def unique_by_domain(urls, index=None):
+    """Keep the first URL per registrable domain, in order, dropping domains already in index"""
+    kept = []
+    seen = set()
+    for url in urls:
+        domain = registrable_domain(url)
+        if domain in seen or (index is not None and index.has_domain(url)):
+            continue
+        seen.add(domain)
+        kept.append(url)
+    return kept
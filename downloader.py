@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ByteBudget:
+    """Counting semaphore over bytes: caps how much body data is held in memory at once"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n):
+        # A single request larger than the whole budget still gets through on its own
+        n = min(n, self.limit)
+        with self._cond:
+            while self.in_flight + n > self.limit:
+                self._cond.wait()
+            self.in_flight += n
+        return n
+
+    def release(self, n):
+        with self._cond:
+            self.in_flight -= n
+            self._cond.notify_all()
+
+
+class StreamingDownloader:
+    """Download many files concurrently, streaming each body to disk in chunks.
+
+    Workers share one requests session (through `get`, which must accept
+    requests' keyword arguments). Every chunk reserves its size from a shared
+    ByteBudget before it is read and releases it once written, so peak memory
+    stays around `max_in_flight_bytes` however large the files are. With
+    `limits` (a ResponseLimits), a body over its type's cap aborts the file.
+    """
+
+    def __init__(self, get, max_workers=8, max_in_flight_bytes=8 * 1024 * 1024, chunk_size=64 * 1024,
+                 store=None, cache=None, metrics=None, limits=None):
+        self.get = get
+        self.store = store
+        self.cache = cache
+        self.metrics = metrics
+        self.limits = limits
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.budget = ByteBudget(max_in_flight_bytes)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _stream(self, response, f):
+        """Copy the response body into f chunk by chunk, within the byte budget"""
+        if self.limits is not None:
+            chunks = self.limits.iter_content(response, self.chunk_size)
+        else:
+            chunks = response.iter_content(self.chunk_size)
+        start = time.perf_counter()
+        size = 0
+        while True:
+            reserved = self.budget.acquire(self.chunk_size)
+            try:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                f.write(chunk)
+                size += len(chunk)
+            finally:
+                self.budget.release(reserved)
+        # Bodies replayed from the HTTP cache were counted when it stored them
+        if self.metrics is not None and hasattr(response, 'raw'):
+            self.metrics.observe('download', time.perf_counter() - start)
+            self.metrics.add_bytes(response.url, size)
+
+    def fetch(self, url, local_path, timeout=30):
+        """Stream url into local_path; raises on HTTP or I/O errors.
+
+        With an asset store, new bodies are streamed into the store first and
+        then linked into place. URLs already in its index are linked without
+        downloading: after the HTTP cache has revalidated them with the
+        server if it has an entry for them, straight away otherwise (a store
+        shared with other mirrors holds bodies this cache has never seen).
+        """
+        if self.store is not None:
+            digest = self.store.lookup(url)
+            if digest is None or (self.cache is not None and self.cache.has_entry(url)):
+                digest = self._fetch_to_store(url, timeout, digest)
+            self.store.link(digest, local_path)
+            return
+
+        if self.cache is not None:
+            response = self.cache.get(self.get, url, timeout=timeout)
+        else:
+            response = self.get(url, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+            # Write to a side file so an aborted download never leaves a truncated asset
+            part_path = local_path + '.part'
+            try:
+                with open(part_path, 'wb') as f:
+                    self._stream(response, f)
+                os.replace(part_path, local_path)
+            except BaseException:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+        finally:
+            response.close()
+
+    def _fetch_to_store(self, url, timeout, digest=None):
+        """Return the store digest for url, downloading into the store unless `digest` is still valid"""
+        if self.cache is not None:
+            # The store already holds the body, so the cache only needs to keep validators
+            response = self.cache.get(self.get, url, cache_body=False, use_entry=digest is not None,
+                                      timeout=timeout)
+            if response.from_cache:
+                return digest
+        else:
+            response = self.get(url, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            blob = self.store.writer()
+            try:
+                self._stream(response, blob)
+            except BaseException:
+                blob.abort()
+                raise
+            return blob.commit(url)
+        finally:
+            response.close()
+
+    def submit(self, url, local_path, download=None):
+        """Schedule download(url, local_path) on the shared worker pool and return its Future"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool.submit(download or self.fetch, url, local_path)
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from politeness import PolitenessScheduler
+
+
+class AsyncFetcher:
+    """Run blocking fetch functions concurrently on an asyncio event loop.
+
+    A global semaphore bounds how many fetches are in flight at once, and each
+    host gets its own semaphore. Request starts are paced by a
+    PolitenessScheduler, so politeness is applied per domain instead of to
+    the whole run.
+    """
+
+    def __init__(self, concurrency=20, per_host=2, scheduler=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.scheduler = scheduler or PolitenessScheduler()
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+
+    async def _throttle(self, url):
+        """Sleep (without holding a worker thread) until the scheduler allows url"""
+        loop = asyncio.get_running_loop()
+        # reserve() may fetch robots.txt, so keep it off the event loop
+        wait = await loop.run_in_executor(self._executor, self.scheduler.reserve, url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _run(self, func, url, queue):
+        host = self._host(url)
+        host_sem = self._host_sems.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with host_sem:
+            await self._throttle(url)
+            async with self._global_sem:
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(self._executor, func, url)
+                except Exception as e:
+                    result = e
+        await queue.put((url, result))
+
+    def map(self, func, urls):
+        """Call func(url) for every URL and yield (url, result) in completion order.
+
+        If func raises, the exception instance is yielded in place of the result.
+        """
+        urls = list(urls)
+        if not urls:
+            return
+
+        loop = asyncio.new_event_loop()
+        self._global_sem = asyncio.Semaphore(self.concurrency)
+        self._host_sems = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        tasks = []
+        try:
+            asyncio.set_event_loop(loop)
+            queue = asyncio.Queue()
+            tasks = [loop.create_task(self._run(func, url, queue)) for url in urls]
+            for _ in range(len(urls)):
+                getter = loop.create_task(queue.get())
+                tasks.append(getter)
+                yield loop.run_until_complete(getter)
+        finally:
+            # Also reached when the caller stops early or an interrupt escapes a fetch
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            asyncio.set_event_loop(None)
+            loop.close()
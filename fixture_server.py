@@ -0,0 +1,240 @@
+"""Local HTTP fixtures for offline benchmarks: fake search engines and company sites.
+
+Usage: python fixture_server.py [--companies 40] [--latency-ms 50] [--error-rate 0.05]
+                                [--stall-rate 0.02] [--stall-ms 5000]
+
+Every company site gets its own port, so politeness pacing, connection
+pools and the dedupe index see one host per company as they would live.
+The Bing and DuckDuckGo stand-ins list every company site in their
+own result-page markup. Pages and assets are generated deterministically
+from `seed`; latency is jittered per response, a configurable share of
+company-site responses fail with a 500 and another share stalls for
+stall_ms before answering, like a hanging site.
+"""
+import argparse
+import hashlib
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+WORDS = ['web', 'design', 'agency', 'studio', 'digital', 'custom', 'software', 'solutions',
+         'responsive', 'ecommerce', 'platform', 'team', 'clients', 'projects', 'quality']
+
+
+class FixtureConfig:
+    """Shape of the generated fixtures"""
+
+    def __init__(self, companies=40, latency_ms=50, page_kb=30, assets=20, asset_kb=50,
+                 error_rate=0.0, seed=0, stall_rate=0.0, stall_ms=5000):
+        self.companies = companies
+        self.latency_ms = latency_ms
+        self.page_kb = page_kb
+        self.assets = assets
+        self.asset_kb = asset_kb
+        self.error_rate = error_rate
+        self.seed = seed
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, handler, config, role, index=0, search_ports=()):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.config = config
+        self.role = role
+        self.index = index
+        self.search_ports = search_ports
+        self.rng = random.Random(f"{config.seed}:{role}:{index}")
+        self.rng_lock = threading.Lock()
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a stalled response (timeouts, hedged requests) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _delay(self):
+        latency = self.server.config.latency_ms / 1000
+        if latency:
+            time.sleep(latency * (0.5 + self.server.random()))
+
+    def do_GET(self):
+        self._delay()
+        path = urlparse(self.path).path
+        if path == '/robots.txt':
+            self._send(200, 'User-agent: *\nAllow: /\n', 'text/plain')
+        elif self.server.role == 'bing':
+            self._send(200, self._bing_results())
+        elif self.server.role == 'company':
+            self._company(path)
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._delay()
+        if self.server.role == 'duckduckgo':
+            self._send(200, self._duckduckgo_results())
+        else:
+            self._send(405, 'method not allowed', 'text/plain')
+
+    def _bing_results(self):
+        items = ''.join(f'<li class="b_algo"><h2><a href="http://127.0.0.1:{port}/">Company {i}</a></h2></li>'
+                        for i, port in enumerate(self.server.search_ports))
+        return f'<html><body><ol id="b_results">{items}</ol></body></html>'
+
+    def _duckduckgo_results(self):
+        # A different ranking, so merging the engines has overlap to resolve
+        ports = list(reversed(self.server.search_ports))
+        items = ''.join(f'<div class="result"><a class="result__a" href="http://127.0.0.1:{port}/">Company</a></div>'
+                        for port in ports)
+        return f'<html><body>{items}</body></html>'
+
+    def _company(self, path):
+        config = self.server.config
+        if config.error_rate and self.server.random() < config.error_rate:
+            self._send(500, 'internal error', 'text/plain')
+            return
+        if config.stall_rate and self.server.random() < config.stall_rate:
+            time.sleep(config.stall_ms / 1000)
+        if path == '/':
+            self._send(200, landing_page(config, self.server.index))
+        elif path in ('/contact', '/about'):
+            self._send(200, sub_page(self.server.index, path))
+        elif path.startswith('/static/'):
+            body = asset_body(path, config.asset_kb)
+            etag = '"' + hashlib.md5(path.encode('utf-8')).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', headers={'ETag': etag})
+                return
+            content_type = 'image/png'
+            if path.endswith('.css'):
+                content_type = 'text/css'
+            elif path.endswith('.js'):
+                content_type = 'application/javascript'
+            self._send(200, body, content_type, {'ETag': etag, 'Cache-Control': 'max-age=0'})
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+
+def landing_page(config, index):
+    """A company's front page: assets, navigation and filler text up to page_kb"""
+    rng = random.Random(f"{config.seed}:page:{index}")
+    head = [f'<html><head><title>Company {index} Web Studio</title>',
+            f'<meta name="description" content="Company {index} builds websites and apps.">']
+    for i in range(config.assets):
+        kind = i % 3
+        if kind == 0:
+            head.append(f'<link rel="stylesheet" href="/static/style{i}.css">')
+        elif kind == 1:
+            head.append(f'<script src="/static/app{i}.js"></script>')
+    head.append('</head><body><nav><a href="/">Home</a><a href="/about">About us</a>'
+                '<a href="/contact">Contact</a></nav>')
+    body = [f'<img src="/static/image{i}.png" alt="">' for i in range(2, config.assets, 3)]
+    # Half the companies only list their email on the contact page
+    if index % 2 == 0:
+        body.append(f'<p>Email us at hello@company{index}.com</p>')
+    size = sum(len(part) for part in head + body)
+    while size < config.page_kb * 1024:
+        block = f"<p>{' '.join(rng.choice(WORDS) for _ in range(80))}</p>"
+        body.append(block)
+        size += len(block)
+    body.append(f'<footer>Call (555) 010-{index % 10000:04d}</footer></body></html>')
+    return ''.join(head + body)
+
+
+def sub_page(index, path):
+    if path == '/contact':
+        return (f'<html><body><h1>Contact</h1><a href="mailto:office@company{index}.com">Write to us</a>'
+                f'<a href="tel:+1-555-010-{index % 10000:04d}">Call</a></body></html>')
+    return f'<html><body><h1>About Company {index}</h1><p>We build websites.</p></body></html>'
+
+
+def asset_body(path, size_kb):
+    seed = hashlib.sha256(path.encode('utf-8')).digest()
+    return (seed * (size_kb * 1024 // len(seed) + 1))[:size_kb * 1024]
+
+
+def start_servers(config):
+    """Start every fixture server on daemon threads; returns (bing_port, ddg_port, company_ports, servers)"""
+    servers = [FixtureServer(FixtureHandler, config, 'company', i) for i in range(config.companies)]
+    company_ports = [server.server_address[1] for server in servers]
+    bing = FixtureServer(FixtureHandler, config, 'bing', search_ports=company_ports)
+    duckduckgo = FixtureServer(FixtureHandler, config, 'duckduckgo', search_ports=company_ports)
+    servers += [bing, duckduckgo]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return bing.server_address[1], duckduckgo.server_address[1], company_ports, servers
+
+
+def _serve(config, ports):
+    bing_port, ddg_port, company_ports, _ = start_servers(config)
+    ports.put((bing_port, ddg_port, company_ports))
+    threading.Event().wait()
+
+
+def start_in_process(config):
+    """Run the fixtures in a child process (so they do not share the GIL); returns (process, ports)"""
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config, ports), daemon=True)
+    process.start()
+    return process, ports.get(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--companies', type=int, default=40)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--page-kb', type=int, default=30)
+    parser.add_argument('--assets', type=int, default=20)
+    parser.add_argument('--asset-kb', type=int, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    parser.add_argument('--stall-ms', type=float, default=5000)
+    args = parser.parse_args()
+
+    config = FixtureConfig(args.companies, args.latency_ms, args.page_kb, args.assets, args.asset_kb,
+                           args.error_rate, args.seed, args.stall_rate, args.stall_ms)
+    bing_port, ddg_port, company_ports, _ = start_servers(config)
+    print(f"Bing:       http://127.0.0.1:{bing_port}/search")
+    print(f"DuckDuckGo: http://127.0.0.1:{ddg_port}/html/")
+    print(f"Companies:  http://127.0.0.1:{company_ports[0]}/ ... http://127.0.0.1:{company_ports[-1]}/")
+    print("Press Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import hashlib
+import itertools
+import math
+import sqlite3
+import tempfile
+import threading
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form of a URL for deduplication (case, default port, fragment, query order)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, `error_rate` false positives"""
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Add item; return True if it was (probably) not present before"""
+        added = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+
+class UrlFrontier:
+    """FIFO crawl frontier that admits every normalized URL at most once.
+
+    Seen URLs live in a Bloom filter, so memory does not grow with the crawl.
+    The pending queue keeps at most `max_in_memory` entries in RAM and spills
+    the rest to a temporary file, preserving breadth-first order.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001, max_in_memory=10000):
+        self.seen = BloomFilter(capacity, error_rate)
+        self.max_in_memory = max_in_memory
+        self._queue = deque()
+        self._spill = None
+        self._spill_read = 0
+        self._spilled = 0
+        self._lock = threading.Lock()
+
+    def add(self, url, depth=0):
+        """Queue url unless an equivalent URL was added before; return True if queued"""
+        url = normalize_url(url)
+        with self._lock:
+            if not self.seen.add(url):
+                return False
+            if self._spilled or len(self._queue) >= self.max_in_memory:
+                self._write_spill(url, depth)
+            else:
+                self._queue.append((url, depth))
+            return True
+
+    def __contains__(self, url):
+        return normalize_url(url) in self.seen
+
+    def _write_spill(self, url, depth):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._spill.seek(0, 2)
+        self._spill.write(f"{depth}\t{url}\n")
+        self._spilled += 1
+
+    def _refill(self):
+        self._spill.seek(self._spill_read)
+        while self._spilled and len(self._queue) < self.max_in_memory:
+            depth, url = self._spill.readline().rstrip('\n').split('\t', 1)
+            self._queue.append((url, int(depth)))
+            self._spilled -= 1
+        self._spill_read = self._spill.tell()
+        if not self._spilled:
+            # Everything has been read back; start the spill file over
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_read = 0
+
+    def pop(self):
+        """Return the oldest pending (url, depth); raises IndexError when empty"""
+        with self._lock:
+            if not self._queue and self._spilled:
+                self._refill()
+            return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue) + self._spilled
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+class PageLinks:
+    """Pages saved by a crawl and the same-site links on each, to fix links up once it is over.
+
+    Kept in a private temporary SQLite database, which SQLite deletes on
+    close, so memory does not grow with pages times links.
+    """
+
+    def __init__(self):
+        self._db = sqlite3.connect('')
+        self._db.execute('CREATE TABLE pages (path TEXT PRIMARY KEY, url TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE links (path TEXT NOT NULL, target TEXT NOT NULL, url TEXT NOT NULL)')
+        self.count = 0
+
+    def add(self, path, url, links):
+        """Record a page saved under path and its links, as (target page path, URL) pairs"""
+        if self._db.execute('DELETE FROM pages WHERE path = ?', (path,)).rowcount == 0:
+            self.count += 1
+        self._db.execute('DELETE FROM links WHERE path = ?', (path,))
+        self._db.execute('INSERT INTO pages (path, url) VALUES (?, ?)', (path, url))
+        self._db.executemany('INSERT INTO links (path, target, url) VALUES (?, ?, ?)',
+                             [(path, target, link) for target, link in links])
+        self._db.commit()
+
+    def missing(self):
+        """(path, url, [(target path, link URL)]) for each saved page linking to pages that were not saved"""
+        rows = self._db.execute(
+            'SELECT links.path, pages.url, links.target, links.url FROM links JOIN pages ON pages.path = links.path '
+            'WHERE links.target NOT IN (SELECT path FROM pages) ORDER BY links.path')
+        for (path, url), group in itertools.groupby(rows, key=lambda row: row[:2]):
+            yield path, url, [(target, link) for _, _, target, link in group]
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._db.close()
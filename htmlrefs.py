@@ -0,0 +1,221 @@
+import re
+import secrets
+from html import escape
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+def make_soup(html):
+    """Parse HTML with the fastest backend available (lxml, else html.parser)"""
+    return BeautifulSoup(html, PARSER)
+
+
+ICON_RELS = {'icon', 'shortcut', 'apple-touch-icon', 'apple-touch-icon-precomposed', 'mask-icon'}
+PRELOAD_RELS = {'preload', 'modulepreload', 'prefetch'}
+
+
+def parse_srcset(value):
+    """[(url, descriptor)] from a srcset attribute; URLs may themselves contain commas"""
+    candidates = []
+    pos, end = 0, len(value)
+    while pos < end:
+        while pos < end and (value[pos].isspace() or value[pos] == ','):
+            pos += 1
+        start = pos
+        while pos < end and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        if not url:
+            break
+        descriptor = ''
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            comma = value.find(',', pos)
+            comma = end if comma == -1 else comma
+            descriptor = value[pos:comma].strip()
+            pos = comma + 1
+        candidates.append((url, descriptor))
+    return candidates
+
+
+class PageResources:
+    """Every resource reference on a page, found in one walk over the tree.
+
+    External references keep a handle on the element and attribute they came
+    from, so template() can mark them for rewriting without searching the
+    tree again. Lists hold external files first, then inline blocks
+    (('inline', text) tuples). Besides stylesheets, scripts and <img src>,
+    images include srcset candidates, posters and icons; `media` holds
+    <source>/<video>/<audio> files and preloads, and `styles` the <style>
+    blocks and style attributes whose CSS has url() references.
+    """
+
+    def __init__(self, soup, page_url):
+        self.soup = soup
+        self.page_url = page_url
+        self.css = []
+        self.js = []
+        self.images = []
+        self.srcsets = []
+        self.media = []
+        self.styles = []
+        self.pages = []
+        self.inline_css = []
+        self.inline_js = []
+
+        for element in soup.find_all(True):
+            name = element.name
+            if name == 'link':
+                rel = {value.lower() for value in element.get('rel') or []}
+                if element.get('href'):
+                    if 'stylesheet' in rel:
+                        self._add(self.css, element, 'href')
+                    elif rel & ICON_RELS:
+                        self._add(self.images, element, 'href')
+                    elif rel & PRELOAD_RELS:
+                        self._add(self.media, element, 'href')
+            elif name == 'script':
+                if element.get('src'):
+                    self._add(self.js, element, 'src')
+                elif element.string:
+                    self.inline_js.append(element.string)
+            elif name == 'img':
+                if element.get('src'):
+                    self._add(self.images, element, 'src')
+                if element.get('srcset'):
+                    self._add_srcset(element)
+            elif name in ('source', 'video', 'audio', 'track'):
+                if element.get('srcset'):
+                    self._add_srcset(element)
+                if element.get('src'):
+                    self._add(self.media, element, 'src')
+                if element.get('poster'):
+                    self._add(self.images, element, 'poster')
+            elif name == 'style':
+                if element.string:
+                    self.inline_css.append(element.string)
+                    if 'url(' in element.string or '@import' in element.string:
+                        self.styles.append((element, None))
+            elif name == 'a':
+                if element.get('href'):
+                    self._add(self.pages, element, 'href')
+            if 'url(' in (element.get('style') or ''):
+                self.styles.append((element, 'style'))
+
+    def _add(self, refs, element, attr):
+        refs.append((urljoin(self.page_url, element[attr]), element, attr))
+
+    def _add_srcset(self, element):
+        candidates = [(urljoin(self.page_url, url), descriptor) for url, descriptor in parse_srcset(element['srcset'])]
+        self.srcsets.append((candidates, element))
+
+    def css_links(self):
+        """Absolute stylesheet URLs, then ('inline', text) for each <style> block"""
+        return [url for url, _, _ in self.css] + [('inline', text) for text in self.inline_css]
+
+    def js_links(self):
+        """Absolute script URLs, then ('inline', text) for each inline <script>"""
+        return [url for url, _, _ in self.js] + [('inline', text) for text in self.inline_js]
+
+    def image_links(self):
+        """Absolute URLs of <img src>, srcset candidates, posters and icons"""
+        links = [url for url, _, _ in self.images]
+        links += [url for candidates, _ in self.srcsets for url, _ in candidates]
+        return links
+
+    def media_links(self):
+        """Absolute URLs of audio/video sources, tracks and preloaded resources"""
+        return [url for url, _, _ in self.media]
+
+    def style_texts(self):
+        """(CSS text, element, attr) for each <style> block (attr None) or style attribute with url()"""
+        return [(element.string if attr is None else element[attr], element, attr) for element, attr in self.styles]
+
+    def page_links(self):
+        """Absolute URLs of every <a href>, fragment removed"""
+        return [url.split('#')[0] for url, _, _ in self.pages]
+
+    def template(self):
+        """The page as a PageTemplate, every rewritable reference replaced by a placeholder.
+
+        Covers the external references, srcsets, styles and <a href> links;
+        the tree is modified, so call this last.
+        """
+        nonce = 'pyscrap' + secrets.token_hex(8)
+        marks = []
+
+        def mark(kind, data, original, in_attr=True):
+            marks.append((kind, data, original, in_attr))
+            return f"{nonce}_{len(marks) - 1}_"
+
+        for kind, refs in (('css', self.css), ('js', self.js), ('images', self.images), ('media', self.media)):
+            for url, element, attr in refs:
+                element[attr] = mark(kind, url, element[attr])
+        for candidates, element in self.srcsets:
+            element['srcset'] = mark('srcset', candidates, element['srcset'])
+        for i, (element, attr) in enumerate(self.styles):
+            if attr is None:
+                element.string = mark('style', i, element.string, in_attr=False)
+            else:
+                element[attr] = mark('style', i, element[attr])
+        for url, element, attr in self.pages:
+            element[attr] = mark('page', url, element[attr])
+        return PageTemplate(self.html(), nonce, marks)
+
+    def html(self):
+        return str(self.soup)
+
+
+class PageTemplate:
+    """A page's HTML with placeholders where its references were, filled in once the assets are local.
+
+    Plain strings and lists only, so a template made in a parse worker
+    pickles back cheaply and fill() needs no second parse. Each mark is
+    (kind, data, original value, in_attr); <style> text is filled in raw,
+    attribute values escaped.
+    """
+
+    def __init__(self, html, nonce, marks):
+        self.html = html
+        self.nonce = nonce
+        self.marks = marks
+
+    def fill(self, local_paths, styles, page_files=None, key=None):
+        """The page's HTML with references pointed at local files.
+
+        local_paths maps 'css', 'js', 'images' and 'media' to {url: local
+        path}; styles holds the new CSS for each style in scan order (None
+        leaves it alone); page_files maps key(url) of pages to local paths,
+        keeping fragments. Anything not found keeps its original value.
+        """
+        page_files = page_files or {}
+
+        def value(kind, data, original):
+            if kind == 'srcset':
+                return ', '.join(f"{local_paths['images'].get(url, url)} {descriptor}".rstrip()
+                                 for url, descriptor in data)
+            if kind == 'style':
+                return original if styles[data] is None else styles[data]
+            if kind == 'page':
+                full_url, _, fragment = data.partition('#')
+                local_path = page_files.get(key(full_url) if key else full_url)
+                if not local_path:
+                    return original
+                return f"{local_path}#{fragment}" if fragment else local_path
+            return local_paths[kind].get(data) or original
+
+        def replace(match):
+            kind, data, original, in_attr = self.marks[int(match.group(1))]
+            text = value(kind, data, original)
+            # Placeholders always sit in double-quoted attributes
+            return escape(text, quote=False).replace('"', '&quot;') if in_attr else text
+
+        return re.sub(re.escape(self.nonce) + r'_(\d+)_', replace, self.html)
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+def parse_cache_control(value):
+    """Split a Cache-Control header into {directive: value or True}"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers, now=None):
+    """Seconds a response stays fresh per Cache-Control, Expires or Last-Modified heuristics"""
+    now = now or time.time()
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            age = int(headers.get('Age') or 0)
+            return max(0, int(directives['max-age']) - age)
+        except ValueError:
+            return 0
+
+    date = _http_date(headers.get('Date')) or now
+    expires = headers.get('Expires')
+    if expires:
+        expires_at = _http_date(expires)
+        return max(0, expires_at - date) if expires_at else 0
+
+    # Heuristic: 10% of the time since last modification, capped at a day
+    last_modified = _http_date(headers.get('Last-Modified'))
+    if last_modified:
+        return min(86400, max(0, (date - last_modified) / 10))
+    return 0
+
+
+# Describe the bytes on the wire, not the decoded body the cache keeps
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+def is_storable(response):
+    directives = parse_cache_control(response.headers.get('Cache-Control'))
+    if response.status_code != 200 or 'no-store' in directives:
+        return False
+    if response.headers.get('Vary', '').strip() == '*':
+        return False
+    # Without validators or a freshness lifetime an entry could never be reused
+    headers = response.headers
+    return bool(headers.get('ETag') or headers.get('Last-Modified') or freshness_lifetime(headers) > 0)
+
+
+class CachedResponse:
+    """The parts of requests.Response the scrapers use, served from a cache entry"""
+
+    def __init__(self, url, status_code, headers, body_path=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.body_path = body_path
+        self.from_cache = True
+        self.encoding = get_encoding_from_headers(self.headers)
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            with open(self.body_path, 'rb') as f:
+                self._content = f.read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def iter_content(self, chunk_size=65536, decode_unicode=False):
+        with open(self.body_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class HttpCache:
+    """On-disk HTTP cache with conditional revalidation and an LRU size cap.
+
+    Bodies are stored as files under `root/bodies`; validators, headers and
+    freshness live in a SQLite index. Fresh entries are answered without
+    touching the network, stale ones are revalidated with If-None-Match /
+    If-Modified-Since, and the least recently used bodies are evicted once
+    the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.body_dir = os.path.join(root, 'bodies')
+        os.makedirs(self.body_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY,
+            headers TEXT NOT NULL,
+            fresh_until REAL NOT NULL,
+            has_body INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )''')
+        self._db.commit()
+
+    def _body_path(self, url):
+        return os.path.join(self.body_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT headers, fresh_until, has_body FROM entries WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        headers, fresh_until, has_body = row
+        if has_body and not os.path.exists(self._body_path(url)):
+            return None
+        return json.loads(headers), fresh_until, bool(has_body)
+
+    def has_entry(self, url):
+        """True if the cache holds an entry for url, fresh or not"""
+        return self._lookup(url) is not None
+
+    def _save(self, url, headers, has_body, size):
+        fresh_until = time.time() + freshness_lifetime(headers)
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (url, headers, fresh_until, has_body, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (url, json.dumps(dict(headers)), fresh_until, int(has_body), size, time.time()))
+            self._db.commit()
+        self._evict(keep=url)
+
+    def _touch(self, url, headers=None):
+        with self._lock:
+            if headers is not None:
+                self._db.execute('UPDATE entries SET headers = ?, fresh_until = ?, last_access = ? WHERE url = ?',
+                                 (json.dumps(headers), time.time() + freshness_lifetime(headers), time.time(), url))
+            else:
+                self._db.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+            self._db.commit()
+
+    def _evict(self, keep=None):
+        """Drop least recently used entries (never `keep`) until the bodies fit in max_bytes"""
+        with self._lock:
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for url, size in self._db.execute('SELECT url, size FROM entries ORDER BY last_access').fetchall():
+                if total <= self.max_bytes:
+                    break
+                if url == keep:
+                    continue
+                self._db.execute('DELETE FROM entries WHERE url = ?', (url,))
+                body_path = self._body_path(url)
+                if os.path.exists(body_path):
+                    os.remove(body_path)
+                total -= size
+            self._db.commit()
+
+    def _tee(self, url, headers, chunks):
+        """Pass a live body through to its reader while writing it into the cache.
+
+        The entry is saved only once the reader has reached the end of the
+        body; one read in part (just a prefix, or cut off at a size cap) is
+        thrown away, so the caller alone decides how much is downloaded.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.body_dir)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            os.replace(temp_path, self._body_path(url))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._save(url, headers, True, size)
+
+    def get(self, fetch, url, cache_body=True, use_entry=True, **kwargs):
+        """GET url through the cache, using fetch(url, **kwargs) for network requests.
+
+        Returns a CachedResponse for fresh or revalidated (304) entries and the
+        live, still streaming response otherwise. A storable body is written
+        to the cache as the caller reads it (see _tee). With cache_body=False only the
+        validators are kept; a hit then has no body and the caller is expected
+        to hold the content elsewhere (see AssetStore). use_entry=False forces
+        a full download but still records the new validators.
+        """
+        entry = self._lookup(url) if use_entry else None
+        if entry is not None and entry[2] != cache_body:
+            entry = None
+
+        if entry is not None:
+            headers, fresh_until, has_body = entry
+            if time.time() < fresh_until:
+                self._touch(url)
+                return CachedResponse(url, 200, headers, self._body_path(url) if has_body else None)
+
+            # Stale: ask the server whether our copy is still good
+            conditional = dict(kwargs.pop('headers', None) or {})
+            if headers.get('ETag'):
+                conditional['If-None-Match'] = headers['ETag']
+            if headers.get('Last-Modified'):
+                conditional['If-Modified-Since'] = headers['Last-Modified']
+            kwargs['headers'] = conditional
+
+        kwargs['stream'] = True
+        response = fetch(url, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            headers = dict(entry[0])
+            headers.update({k: v for k, v in response.headers.items()
+                            if k.lower() in ('cache-control', 'expires', 'date', 'etag', 'last-modified', 'age')})
+            self._touch(url, headers)
+            return CachedResponse(url, 200, headers, self._body_path(url) if entry[2] else None)
+
+        response.from_cache = False
+        if not is_storable(response):
+            return response
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+        if not cache_body:
+            self._save(url, headers, False, 0)
+            return response
+
+        # Reading the body, also through .content or .text, goes through the tee
+        iter_content = response.iter_content
+        response.iter_content = lambda chunk_size=1, decode_unicode=False: \
+            self._tee(url, headers, iter_content(chunk_size))
+        return response
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,99 @@
+import json
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+DONE = 'done'
+# Done, but the record was not kept (a duplicate, directory or near-duplicate)
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+class Journal:
+    """Durable record of pending, done, skipped and failed URLs so interrupted runs can resume.
+
+    Work is grouped by scope (one city search, one mirrored site). Every
+    status change is committed immediately; a scope is cleared once its run
+    completes, so only interrupted runs are resumed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            scope TEXT NOT NULL,
+            url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (scope, url)
+        )''')
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+        return rows
+
+    def has_scope(self, scope):
+        return bool(self._execute('SELECT 1 FROM jobs WHERE scope = ? LIMIT 1', (scope,)))
+
+    def add_pending(self, scope, urls):
+        """Register urls as pending work (already known URLs keep their status)"""
+        now = time.time()
+        with self._lock:
+            start = self._db.execute('SELECT COUNT(*) FROM jobs WHERE scope = ?', (scope,)).fetchone()[0]
+            self._db.executemany(
+                'INSERT OR IGNORE INTO jobs (scope, url, position, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(scope, url, start + i, PENDING, now) for i, url in enumerate(urls)])
+            self._db.commit()
+
+    def unfinished(self, scope):
+        """URLs still pending or failed, in the order they were added"""
+        rows = self._execute('SELECT url FROM jobs WHERE scope = ? AND status NOT IN (?, ?) ORDER BY position',
+                             (scope, DONE, SKIPPED))
+        return [url for url, in rows]
+
+    def finished(self, scope):
+        """(url, result) pairs for completed work that was kept, in the order they were added"""
+        rows = self._execute('SELECT url, result FROM jobs WHERE scope = ? AND status = ? ORDER BY position',
+                             (scope, DONE))
+        return [(url, json.loads(result) if result else None) for url, result in rows]
+
+    def result(self, scope, url):
+        """The stored result for a completed url, or None if it is not done"""
+        rows = self._execute('SELECT result FROM jobs WHERE scope = ? AND url = ? AND status = ?',
+                             (scope, url, DONE))
+        return json.loads(rows[0][0]) if rows and rows[0][0] else None
+
+    def _mark(self, scope, url, status, result):
+        self._execute(
+            'INSERT INTO jobs (scope, url, position, status, result, attempts, updated_at) '
+            'VALUES (?, ?, (SELECT COUNT(*) FROM jobs WHERE scope = ?), ?, ?, 1, ?) '
+            'ON CONFLICT (scope, url) DO UPDATE SET status = excluded.status, result = excluded.result, '
+            'attempts = attempts + 1, updated_at = excluded.updated_at',
+            (scope, url, scope, status, json.dumps(result), time.time()))
+
+    def mark_done(self, scope, url, result=None):
+        self._mark(scope, url, DONE, result)
+
+    def mark_skipped(self, scope, url):
+        self._mark(scope, url, SKIPPED, None)
+
+    def mark_failed(self, scope, url, error=None):
+        self._mark(scope, url, FAILED, {'error': str(error)} if error else None)
+
+    def clear(self, scope):
+        """Forget a scope once its run has finished"""
+        self._execute('DELETE FROM jobs WHERE scope = ?', (scope,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
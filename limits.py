@@ -0,0 +1,124 @@
+import requests
+
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Per-type body caps in bytes, matched on the longest Content-Type prefix
+DEFAULT_CAPS = {
+    'text/html': 10 * 1024 * 1024,
+    'application/xhtml+xml': 10 * 1024 * 1024,
+    'text/': 10 * 1024 * 1024,
+    'application/javascript': 10 * 1024 * 1024,
+    'application/json': 10 * 1024 * 1024,
+    'image/': 50 * 1024 * 1024,
+    'font/': 20 * 1024 * 1024,
+}
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """The body is (or announces itself as) larger than its type's cap"""
+
+
+class UnwantedContentType(requests.exceptions.RequestException):
+    """The server answered with a Content-Type the caller does not accept"""
+
+
+def content_type(response):
+    return response.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+
+
+class LimitedBody:
+    """A streaming response body read in stages, never past its byte cap.
+
+    read_until(n) returns at least the first n bytes (or the whole body if
+    it is shorter), read_all() the rest up to the cap. Chunks are no larger
+    than the first read asks for, so a short prefix is not rounded up to a
+    whole chunk_size. With truncate=True a body that runs past the cap is
+    cut there and `truncated` is set; otherwise ResponseTooLarge is raised
+    as soon as the cap is crossed.
+    """
+
+    def __init__(self, response, cap, truncate=False, chunk_size=64 * 1024):
+        self.response = response
+        self.cap = cap
+        self.truncate = truncate
+        self.truncated = False
+        self.complete = False
+        self.chunk_size = chunk_size
+        self._chunks = None
+        self._parts = []
+        self._size = 0
+
+        length = response.headers.get('Content-Length', '')
+        if not truncate and length.isdigit() and int(length) > cap:
+            raise ResponseTooLarge(f"{response.url} is {int(length)} bytes, over the {cap} byte limit")
+
+    def _read(self, n):
+        if self._chunks is None:
+            self._chunks = self.response.iter_content(max(1, min(self.chunk_size, n)))
+        while not self.complete and self._size < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.complete = True
+                break
+            if self._size + len(chunk) > self.cap:
+                if not self.truncate:
+                    raise ResponseTooLarge(f"{self.response.url} is over the {self.cap} byte limit")
+                chunk = chunk[:self.cap - self._size]
+                self.truncated = self.complete = True
+            self._parts.append(chunk)
+            self._size += len(chunk)
+        return b''.join(self._parts)
+
+    def read_until(self, n):
+        return self._read(min(n, self.cap))
+
+    def read_all(self):
+        return self._read(self.cap + 1)
+
+    def __len__(self):
+        return self._size
+
+
+class ResponseLimits:
+    """Content-Type filtering and per-type size caps for streamed responses"""
+
+    def __init__(self, caps=None, default_cap=100 * 1024 * 1024):
+        self.caps = dict(DEFAULT_CAPS, **(caps or {}))
+        self.default_cap = default_cap
+
+    def cap_for(self, response):
+        ctype = content_type(response)
+        matches = [prefix for prefix in self.caps if ctype.startswith(prefix)]
+        return self.caps[max(matches, key=len)] if matches else self.default_cap
+
+    def check(self, response, accept=None):
+        """Raise UnwantedContentType unless the response's type starts with one of `accept`"""
+        if accept is None:
+            return
+        ctype = content_type(response)
+        # A missing Content-Type is given the benefit of the doubt
+        if ctype and not ctype.startswith(tuple(accept)):
+            raise UnwantedContentType(f"{response.url} is {ctype}, not {', '.join(accept)}")
+
+    def body(self, response, truncate=False):
+        return LimitedBody(response, self.cap_for(response), truncate)
+
+    def iter_content(self, response, chunk_size=64 * 1024):
+        """response.iter_content that raises ResponseTooLarge once the cap is crossed"""
+        cap = self.cap_for(response)
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > cap:
+            raise ResponseTooLarge(f"{response.url} is {int(length)} bytes, over the {cap} byte limit")
+        size = 0
+        for chunk in response.iter_content(chunk_size):
+            size += len(chunk)
+            if size > cap:
+                raise ResponseTooLarge(f"{response.url} is over the {cap} byte limit")
+            yield chunk
+
+    def read(self, response, truncate=False):
+        """Read the body (up to its cap) and keep it on the response, as requests does once it is consumed"""
+        body = self.body(response, truncate).read_all()
+        response._content = body
+        response._content_consumed = True
+        return body
@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Upper bounds in seconds, Prometheus style (a final +Inf bucket is implied)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are estimated from the bucket bounds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (the max for the +Inf bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.sum, 4),
+            'mean_s': round(self.sum / self.count, 4) if self.count else 0.0,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+            'p99_s': self.quantile(0.99),
+            'max_s': round(self.max, 4),
+        }
+
+
+class Metrics:
+    """Run metrics shared by the scrapers and their helpers.
+
+    Stages (dns, ttfb, download, parse, extract, write, ...) get a latency
+    histogram each, ttfb being the time to response headers; responses and
+    errors are counted per host, transferred body bytes per host, and queue
+    depths are kept as gauges together with their peak. Everything is
+    thread-safe. `summary()` gives a JSON-ready dict for the end of a run
+    and `serve()` exposes the same data as a Prometheus text endpoint while
+    the run is going.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.stages = defaultdict(Histogram)
+        self.counters = Counter()
+        self.bytes = Counter()
+        self.status = defaultdict(Counter)
+        self.errors = defaultdict(Counter)
+        self.gauges = {}
+        self.gauge_peaks = {}
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower() or url
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the body of a with block as one observation of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_bytes(self, url, n):
+        with self._lock:
+            self.bytes[self._host(url)] += n
+
+    def record_status(self, url, status_code):
+        with self._lock:
+            self.status[self._host(url)][status_code] += 1
+
+    def record_error(self, url, error):
+        with self._lock:
+            self.errors[self._host(url)][type(error).__name__] += 1
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+            self.gauge_peaks[name] = max(value, self.gauge_peaks.get(name, value))
+
+    def on_response(self, response, *args, **kwargs):
+        """requests response hook: status per host and time to response headers"""
+        self.record_status(response.url, response.status_code)
+        self.observe('ttfb', response.elapsed.total_seconds())
+
+    def summary(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'duration_s': round(time.time() - self.started, 3),
+                'stages': {stage: histogram.summary() for stage, histogram in sorted(self.stages.items())},
+                'counters': dict(self.counters),
+                'bytes_total': sum(self.bytes.values()),
+                'bytes_per_host': dict(self.bytes.most_common()),
+                'status_per_host': {host: {str(code): n for code, n in codes.items()}
+                                    for host, codes in sorted(self.status.items())},
+                'errors_per_host': {host: dict(errors) for host, errors in sorted(self.errors.items())},
+                'queues': {name: {'current': value, 'peak': self.gauge_peaks[name]}
+                           for name, value in sorted(self.gauges.items())},
+            }
+
+    def write_json(self, path):
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def prometheus(self, prefix='scraper'):
+        """The metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines.append(f'# TYPE {prefix}_events_total counter')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+            lines.append(f'# TYPE {prefix}_bytes_total counter')
+            for host, value in sorted(self.bytes.items()):
+                lines.append(f'{prefix}_bytes_total{{host="{host}"}} {value}')
+            lines.append(f'# TYPE {prefix}_responses_total counter')
+            for host, codes in sorted(self.status.items()):
+                for code, value in sorted(codes.items()):
+                    lines.append(f'{prefix}_responses_total{{host="{host}",code="{code}"}} {value}')
+            lines.append(f'# TYPE {prefix}_errors_total counter')
+            for host, errors in sorted(self.errors.items()):
+                for error, value in sorted(errors.items()):
+                    lines.append(f'{prefix}_errors_total{{host="{host}",error="{error}"}} {value}')
+            lines.append(f'# TYPE {prefix}_queue_depth gauge')
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'{prefix}_queue_depth{{queue="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics in Prometheus format from a daemon thread; returns the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def report(self):
+        """One line per stage, for the end-of-run console summary"""
+        summary = self.summary()
+        lines = [f"{'stage':<10}{'count':>8}{'total s':>10}{'p50 s':>9}{'p95 s':>9}"]
+        for stage, s in summary['stages'].items():
+            lines.append(f"{stage:<10}{s['count']:>8}{s['total_s']:>10.2f}{s['p50_s']:>9.3f}{s['p95_s']:>9.3f}")
+        lines.append(f"{summary['bytes_total'] / 1024 / 1024:.1f} MB transferred in {summary['duration_s']:.1f}s")
+        return '\n'.join(lines)
@@ -0,0 +1,165 @@
+"""CPU-bound HTML parsing, run in worker processes so it does not share the GIL with network I/O.
+
+Jobs take raw page bytes (or text) plus a URL and return small picklable
+records: no BeautifulSoup objects ever cross the process boundary. Every
+job function is a plain module-level function, so it can be called
+directly as well as through a ParsePool.
+"""
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from contacts import INVISIBLE_TAGS, extract_contacts, rank_contact_links
+from dedupe import registrable_domain
+from htmlrefs import PageResources, make_soup
+from simhash import simhash
+
+WORD = re.compile(r'\w+')
+# Word 3-grams; pages with fewer have too little text to compare reliably
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 50
+
+
+class ParsePool:
+    """Run parse jobs in a process pool, started on first use.
+
+    processes=None uses one process per core (none on a single core, where
+    a worker only adds pickling overhead); 0 runs every job on the calling
+    thread. Workers are spawned rather than forked, since the scrapers call
+    in from many threads.
+    """
+
+    def __init__(self, processes=None):
+        if processes is None:
+            cores = os.cpu_count() or 1
+            processes = cores if cores > 1 else 0
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def run(self, func, *args):
+        """func(*args) in a worker process (or inline); blocks the calling thread until it is done"""
+        if not self.processes:
+            return func(*args)
+        return self._pool().submit(func, *args).result()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def visible_strings(soup):
+    """Text nodes a visitor would see, in document order"""
+    stack = [soup]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name not in INVISIBLE_TAGS:
+                stack.extend(reversed(node.contents))
+        elif isinstance(node, NavigableString) and not isinstance(node, Comment):
+            yield node
+
+
+def _fingerprint(soup, page_url):
+    words = WORD.findall(' '.join(visible_strings(soup)).lower())
+    shingles = Counter(' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    site = registrable_domain(page_url)
+    domains = {registrable_domain(anchor['href']) for anchor in soup.find_all('a', href=True)
+               if anchor['href'].startswith(('http://', 'https://'))}
+    domains.discard(site)
+    return {
+        'simhash': simhash(shingles) if len(shingles) >= MIN_SHINGLES else None,
+        'external_domains': len(domains),
+    }
+
+
+def page_fingerprint(html, page_url):
+    """SimHash of a page's visible text (word 3-grams) and the number of other sites it links to.
+
+    Meant for the first few KB of a page, so directories and near-duplicate
+    pages can be recognised before the rest is downloaded. `simhash` is None
+    when there is too little text to go on.
+    """
+    return _fingerprint(BeautifulSoup(html, 'html.parser'), page_url)
+
+
+def parse_company_page(html, page_url, max_contact_links=0, fingerprint=False):
+    """Title, meta description, email and phone of a company page.
+
+    When email or phone is missing, `contact_links` lists up to
+    max_contact_links same-site pages worth checking for them. With
+    fingerprint=True, `fingerprint` holds the page_fingerprint record as
+    well. `timings` holds the parse and extract seconds spent in the worker.
+    """
+    start = time.perf_counter()
+    soup = BeautifulSoup(html, 'html.parser')
+    parsed = time.perf_counter()
+
+    # Email and phone from mailto:/tel: links, JSON-LD or visible text
+    email, phone = extract_contacts(soup)
+    title = soup.title.string if soup.title else "N/A"
+    if title:
+        title = title.strip()
+    description = "N/A"
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc and 'content' in meta_desc.attrs:
+        description = meta_desc['content'][:200]
+    contact_links = []
+    if max_contact_links and not (email and phone):
+        contact_links = rank_contact_links(soup, page_url, max_contact_links)
+
+    page = {
+        'title': title,
+        'description': description,
+        'email': email,
+        'phone': phone,
+        'contact_links': contact_links,
+    }
+    if fingerprint:
+        page['fingerprint'] = _fingerprint(soup, page_url)
+    page['timings'] = {'parse': parsed - start, 'extract': time.perf_counter() - parsed}
+    return page
+
+
+def page_scan(resources):
+    """Everything _mirror_page needs to know about a page, as plain lists"""
+    return {
+        'css': resources.css_links(),
+        'js': resources.js_links(),
+        'images': resources.image_links(),
+        'media': resources.media_links(),
+        'styles': [text for text, _, _ in resources.style_texts()],
+        'pages': resources.page_links(),
+    }
+
+
+def template_page(html, page_url):
+    """Parse a page once: its page_scan record, and a PageTemplate to fill in when its assets are local"""
+    resources = PageResources(make_soup(html), page_url)
+    return page_scan(resources), resources.template()
+
+
+def unlink_pages(html, links):
+    """Point every <a href> whose value (fragment aside) is a key of links back at links[value]"""
+    resources = PageResources(make_soup(html), '')
+    for _, element, attr in resources.pages:
+        path, _, fragment = element[attr].partition('#')
+        url = links.get(path)
+        if url:
+            element[attr] = f"{url}#{fragment}" if fragment else url
+    return resources.html()
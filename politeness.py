@@ -0,0 +1,150 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+
+class TokenBucket:
+    """Classic token bucket; reserve() hands out future slots instead of blocking"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """Take one token and return how many seconds the caller must wait for it"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class PolitenessScheduler:
+    """Per-host request pacing shared by the scrapers.
+
+    Every host gets its own token bucket, slowed down to the robots.txt
+    Crawl-delay when the site asks for one. 429 and 503 responses put the
+    host into an exponential backoff (or the server's Retry-After), which
+    decays again on successful responses. Hosts never wait on each other.
+    """
+
+    def __init__(self, rate=1.0, burst=1, user_agent='*', respect_robots=True,
+                 session=None, max_backoff=300, robots_ttl=3600):
+        self.rate = rate
+        self.burst = burst
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.session = session
+        self.max_backoff = max_backoff
+        self.robots_ttl = robots_ttl
+
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self._buckets = {}
+        self._robots = {}
+        self._backoff = {}
+        self._blocked_until = {}
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+
+    def _fetch_robots(self, url):
+        """Download and parse robots.txt for the host of url (None if unavailable)"""
+        parsed = urlparse(url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        getter = self.session.get if self.session is not None else requests.get
+        try:
+            response = getter(robots_url, timeout=10)
+        except requests.exceptions.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        parser = RobotFileParser(robots_url)
+        parser.parse(response.text.splitlines())
+        return parser
+
+    def crawl_delay(self, url):
+        """Return the Crawl-delay robots.txt sets for our user agent, or None"""
+        if not self.respect_robots:
+            return None
+        host = self._host(url)
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+
+        # Only one thread per host fetches robots.txt; other hosts carry on
+        with host_lock:
+            cached = self._robots.get(host)
+            if cached is None or time.monotonic() - cached[0] > self.robots_ttl:
+                cached = (time.monotonic(), self._fetch_robots(url))
+                self._robots[host] = cached
+        parser = cached[1]
+        if parser is None:
+            return None
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay else None
+
+    def _bucket(self, url):
+        host = self._host(url)
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.rate
+            delay = self.crawl_delay(url)
+            if delay:
+                rate = min(rate, 1.0 / delay)
+            with self._lock:
+                bucket = self._buckets.setdefault(host, TokenBucket(rate, self.burst))
+        return bucket
+
+    def reserve(self, url):
+        """Reserve the next request slot for url's host and return the wait in seconds"""
+        bucket = self._bucket(url)
+        host = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            wait = bucket.reserve(now)
+            blocked = self._blocked_until.get(host, 0) - now
+            return max(wait, blocked, 0.0)
+
+    def wait(self, url):
+        """Block the calling thread until url's host may be requested again"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _retry_after(self, headers):
+        value = headers.get('Retry-After') if headers else None
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def record(self, url, status_code, headers=None):
+        """Feed a response status back so the host's backoff can adapt"""
+        host = self._host(url)
+        with self._lock:
+            if status_code in (429, 503):
+                backoff = min(self.max_backoff, max(1.0 / self.rate, self._backoff.get(host, 0) * 2 or 1.0))
+                retry_after = self._retry_after(headers)
+                if retry_after is not None:
+                    backoff = min(self.max_backoff, max(backoff, retry_after))
+                self._backoff[host] = backoff
+                self._blocked_until[host] = time.monotonic() + backoff
+            elif host in self._backoff:
+                backoff = self._backoff[host] / 2
+                if backoff < 0.5:
+                    del self._backoff[host]
+                else:
+                    self._backoff[host] = backoff
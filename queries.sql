@@ -187,3 +187,19 @@ CREATE TABLE `stock_vendors` (
  `updated_at` timestamp NULL DEFAULT NULL,
  PRIMARY KEY (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+
+
+-- scraper output (sinks.DbSink upserts on url)
+CREATE TABLE `companies` (
+ `id` int(11) NOT NULL AUTO_INCREMENT,
+ `url` varchar(512) DEFAULT NULL,
+ `title` varchar(1024) DEFAULT NULL,
+ `description` varchar(1024) DEFAULT NULL,
+ `email` varchar(1024) DEFAULT NULL,
+ `phone` varchar(1024) DEFAULT NULL,
+ `city` varchar(1024) DEFAULT NULL,
+ `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+ `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+ PRIMARY KEY (`id`),
+ UNIQUE KEY `companies_url` (`url`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
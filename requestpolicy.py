@@ -0,0 +1,294 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+
+# Methods that may be sent twice (retried or hedged) without side effects
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Gateway errors worth another attempt; 429 and 503 also back the host off in the scheduler
+RETRY_STATUSES = (502, 503, 504)
+
+RETRY_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class LatencyEstimate:
+    """Smoothed time to response headers and its mean deviation (Jacobson/Karels, as for TCP's RTO)"""
+
+    def __init__(self, alpha=0.125, beta=0.25, window=64):
+        self.alpha = alpha
+        self.beta = beta
+        self.mean = None
+        self.deviation = 0.0
+        self.count = 0
+        # Recent samples, for the hedging quantile
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        if self.mean is None:
+            self.mean = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation = (1 - self.beta) * self.deviation + self.beta * abs(self.mean - seconds)
+            self.mean = (1 - self.alpha) * self.mean + self.alpha * seconds
+        self.count += 1
+        self.samples.append(seconds)
+
+    def bound(self):
+        """Latency few responses should exceed: mean plus four deviations"""
+        return self.mean + 4 * self.deviation
+
+    def quantile(self, q):
+        values = sorted(self.samples)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RetryBudget:
+    """Retries (and hedges) allowed as a share of all requests, shared by every thread.
+
+    Each request deposits `ratio` of a token and each extra attempt takes a
+    whole one, so when a large part of the hosts is failing the extra load
+    stays near `ratio` of the normal load instead of multiplying it. The
+    balance starts at, and never grows past, `reserve` tokens.
+    """
+
+    def __init__(self, ratio=0.1, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RequestPolicy:
+    """Adaptive timeouts, budgeted retries and hedged requests around a send function.
+
+    Every response's time to headers feeds a per-host latency estimate (and
+    a run-wide one, used for hosts seen fewer than `min_samples` times).
+    Connect and read timeouts follow the estimate instead of a fixed value,
+    within their floors and the caller's timeout, which becomes the deadline
+    for all attempts together; a timed-out attempt doubles the next one's.
+    Once the headers are in, the body is read with the caller's timeout.
+
+    Connection errors, timeouts and gateway errors (RETRY_STATUSES) of
+    idempotent requests are retried up to `retries` times after a jittered
+    exponential backoff, while the shared RetryBudget allows it. With
+    `hedge_quantile`, a request still waiting for headers after that
+    quantile of recent latencies gets a second identical request (also
+    paid for from the budget) and whichever answers first is used.
+    """
+
+    def __init__(self, retries=2, backoff=0.25, max_backoff=5.0, retry_ratio=0.1, retry_reserve=10,
+                 connect_timeout=(1.0, 10.0), read_factor=3.0, min_read_timeout=3.0,
+                 hedge_quantile=0.95, min_samples=5, hedge_samples=20, hedge_workers=256, metrics=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = RetryBudget(retry_ratio, retry_reserve)
+        # (floor, ceiling) of the connect timeout
+        self.connect_timeout = connect_timeout
+        self.read_factor = read_factor
+        self.min_read_timeout = min_read_timeout
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.hedge_samples = hedge_samples
+        # Hedgeable requests run on this many pool threads, started only as
+        # needed; keep it above the number of threads sending requests
+        self.hedge_workers = hedge_workers
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._overall = LatencyEstimate(window=512)
+        self._pool = None
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+
+    def _inc(self, name):
+        if self.metrics is not None:
+            self.metrics.inc(name)
+
+    def _estimate(self, url):
+        """The host's latency estimate, or the run-wide one while the host has too few samples"""
+        with self._lock:
+            estimate = self._hosts.get(self._host(url))
+            if estimate is None or estimate.count < self.min_samples:
+                estimate = self._overall
+            return estimate if estimate.count else None
+
+    def observe(self, url, seconds):
+        with self._lock:
+            self._hosts.setdefault(self._host(url), LatencyEstimate()).observe(seconds)
+            self._overall.observe(seconds)
+
+    def timeout(self, url, ceiling=None, attempt=0):
+        """(connect, read) timeout for attempt number `attempt` to url, neither above `ceiling`"""
+        ceiling = ceiling or float('inf')
+        floor, connect_ceiling = self.connect_timeout
+        estimate = self._estimate(url)
+        if estimate is None:
+            connect, read = connect_ceiling, ceiling
+        else:
+            with self._lock:
+                bound = estimate.bound()
+            connect = min(connect_ceiling, max(floor, bound))
+            read = max(self.min_read_timeout, self.read_factor * bound)
+        scale = 2 ** attempt
+        read = min(ceiling, read * scale)
+        return min(ceiling, connect * scale), None if read == float('inf') else read
+
+    def hedge_delay(self, url):
+        """Seconds to wait for headers before hedging a request to url, or None not to hedge"""
+        if self.hedge_quantile is None:
+            return None
+        with self._lock:
+            estimate = self._hosts.get(self._host(url))
+            if estimate is None or len(estimate.samples) < self.hedge_samples:
+                estimate = self._overall
+            if len(estimate.samples) < self.hedge_samples:
+                return None
+            return estimate.quantile(self.hedge_quantile)
+
+    def _sleep_before(self, attempt, deadline):
+        """Sleep a jittered exponential backoff; False if it would run past the deadline"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def send(self, send, url, method='GET', timeout=None, pace=None):
+        """Return send(timeout) under this policy.
+
+        `send` makes one attempt and returns the response with its headers
+        read (the body may still be streaming). `pace(retry)`, if given, is
+        called before every attempt to wait for the host's slot; `retry` is
+        True for retries and hedges. `timeout` is the overall deadline in
+        seconds (None for none).
+        """
+        deadline = time.monotonic() + timeout if timeout else float('inf')
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            attempt_timeout = self.timeout(url, remaining if timeout else None, attempt)
+            try:
+                if idempotent:
+                    response = self._hedged(send, pace, url, attempt_timeout, attempt > 0)
+                else:
+                    response = _Attempt(send, pace, attempt_timeout, attempt > 0)()
+            except RETRY_ERRORS as e:
+                if isinstance(e, requests.exceptions.Timeout):
+                    self._inc('timeouts')
+                if not self._may_retry(idempotent, attempt, deadline):
+                    raise
+            else:
+                self.observe(url, response.elapsed.total_seconds())
+                if response.status_code not in RETRY_STATUSES or not self._may_retry(idempotent, attempt, deadline):
+                    _body_timeout(response, timeout)
+                    return response
+                response.close()
+            attempt += 1
+            self._inc('retries')
+
+    def _may_retry(self, idempotent, attempt, deadline):
+        if not idempotent or attempt >= self.retries:
+            return False
+        if not self.budget.withdraw():
+            self._inc('retry_budget_exhausted')
+            return False
+        return self._sleep_before(attempt, deadline)
+
+    def _hedged(self, send, pace, url, timeout, retry):
+        """send(), plus a second identical request if the first is slower than the hedge delay.
+
+        The delay is counted from when the first attempt is actually sent,
+        not from when it was queued for a pool worker or paced, so a busy
+        pool or a politeness wait never passes for a slow host.
+        """
+        delay = self.hedge_delay(url)
+        if delay is None:
+            return _Attempt(send, pace, timeout, retry)()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hedge_workers)
+        attempt = _Attempt(send, pace, timeout, retry)
+        first = self._pool.submit(attempt)
+        attempt.started.wait()
+        done, _ = wait([first], timeout=max(0.0, attempt.sent + delay - time.monotonic()))
+        if done or not self.budget.withdraw():
+            return first.result()
+        self._inc('hedged_requests')
+        second = self._pool.submit(_Attempt(send, pace, timeout, True))
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            answered = [future for future in done if future.exception() is None]
+            if answered or not pending:
+                break
+        winner = answered[0] if answered else first
+        for loser in {first, second} - {winner}:
+            # Possibly still in flight: drop its connection once it answers
+            loser.add_done_callback(_close_response)
+        if winner is second and answered:
+            self._inc('hedge_wins')
+        return winner.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Attempt:
+    """One attempt: pace(retry), then send(timeout), noting when the request actually went out"""
+
+    def __init__(self, send, pace, timeout, retry):
+        self.send = send
+        self.pace = pace
+        self.timeout = timeout
+        self.retry = retry
+        self.sent = None
+        self.started = threading.Event()
+
+    def __call__(self):
+        try:
+            if self.pace is not None:
+                self.pace(self.retry)
+        finally:
+            self.sent = time.monotonic()
+            self.started.set()
+        return self.send(self.timeout)
+
+
+def _body_timeout(response, timeout):
+    """Give the rest of a streaming response the caller's own read timeout.
+
+    The adaptive timeout is meant for the wait for headers; a body that
+    pauses for a few seconds half way (a large asset from a slow CDN) is
+    read as patiently as before, and no attempt is retried at that stage.
+    """
+    connection = getattr(getattr(response, 'raw', None), 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        sock.settimeout(timeout)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
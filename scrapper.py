@@ -1,78 +1,109 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-import time
-import csv
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fetcher import AsyncFetcher
+from politeness import PolitenessScheduler
+from httpcache import HttpCache, CachedResponse
+from sinks import FIELDNAMES, CsvSink
+from journal import Journal
+from transport import Transport, make_session
+from requestpolicy import RequestPolicy
+from metrics import Metrics
+from limits import HTML_TYPES, ResponseLimits
+from search import PROVIDERS, MultiSearch, SearchCache
+from dedupe import DedupeIndex, registrable_domain, unique_by_domain
+from parsing import ParsePool, page_fingerprint, parse_company_page
+from simhash import SimHashIndex
 
 class WebDevScraper:
-    def __init__(self):
+    def __init__(self, concurrency=20, per_host=2, host_delay=3,
+                 use_cache=True, cache_dir='.http_cache', cache_max_bytes=512 * 1024 * 1024,
+                 keep_results=True, journal_path='.scrape_journal.sqlite', max_contact_pages=3,
+                 dns_ttl=300, search_cache_path='.search_cache.sqlite', search_ttl=24 * 3600,
+                 dedupe_path='.company_index.sqlite', metrics_path='scrape_metrics.json', metrics_port=None,
+                 limits=None, html_prefix_bytes=256 * 1024, parse_workers=None,
+                 near_dup_distance=3, near_dup_bytes=16 * 1024, near_dup_action='drop', directory_min_domains=25,
+                 retries=2, retry_ratio=0.1, hedge_quantile=0.95):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
         self.results = []
+        
+        # Long runs stream records to a sink instead of holding them all in memory
+        self.keep_results = keep_results
+        
+        # Per-stage timings, bytes and per-host status counts; saved as JSON after
+        # each city and optionally served to Prometheus while the run goes
+        self.metrics = Metrics()
+        self.metrics_path = metrics_path
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+        
+        # Keep-alive connections are pooled per host and reused across searches,
+        # landing pages and contact pages; lookups go through a DNS cache
+        self.session = make_session(self.headers['User-Agent'], pool_connections=concurrency,
+                                    pool_maxsize=max(per_host, max_contact_pages), dns_ttl=dns_ttl,
+                                    metrics=self.metrics)
+        
+        # Bodies are streamed under per-type size caps; company pages are parsed
+        # from their first html_prefix_bytes unless contacts need the rest
+        self.limits = limits or ResponseLimits()
+        self.html_prefix_bytes = html_prefix_bytes
+        
+        # Pages are parsed in worker processes (one per core by default, 0 for
+        # in-thread) so parsing scales past the GIL while fetch threads wait on I/O
+        self.parser = ParsePool(parse_workers)
+        
+        # Contact/about sub-pages fetched per company when the landing page lacks details
+        self.max_contact_pages = max_contact_pages
+        
+        # Fetches run concurrently; the politeness delay applies per host. The burst
+        # lets a company's landing page and its contact pages go out back to back.
+        self.scheduler = PolitenessScheduler(rate=1.0 / host_delay, burst=1 + max_contact_pages,
+                                             user_agent=self.headers['User-Agent'], session=self.session)
+        self.fetcher = AsyncFetcher(concurrency=concurrency, per_host=per_host, scheduler=self.scheduler)
+        
+        # Nightly re-runs revalidate cached pages instead of downloading them again
+        self.cache = HttpCache(cache_dir, cache_max_bytes) if use_cache else None
+        
+        # Searches, landing pages and contact pages all go through one request path
+        self.policy = RequestPolicy(retries, retry_ratio=retry_ratio, hedge_quantile=hedge_quantile,
+                                    metrics=self.metrics)
+        self.transport = Transport(self.session, self.scheduler, self.policy, self.limits, self.metrics, self.cache)
+        
+        # Interrupted city runs resume from the journal instead of starting over
+        self.journal = Journal(journal_path) if journal_path else None
+        
+        # Search engines are queried in parallel; repeat queries come from the search cache
+        self.search_cache = SearchCache(search_cache_path, search_ttl) if search_cache_path else None
+        self.search = MultiSearch({name: provider() for name, provider in PROVIDERS.items()},
+                                  self.transport.request, self.search_cache, parse=self.parser.run)
+        
+        # Companies scraped in any earlier run, by domain, email and phone
+        self.dedupe = DedupeIndex(dedupe_path) if dedupe_path else None
+        
+        # Directories and near-duplicate landing pages are dropped (or flagged) early
+        self.near_dup_distance = near_dup_distance
+        self.near_dup_bytes = near_dup_bytes
+        self.near_dup_action = near_dup_action
+        self.directory_min_domains = directory_min_domains
+        # Columns of a result record; flagged records carry their reason too
+        self.fieldnames = FIELDNAMES + (['near_duplicate'] if near_dup_action == 'flag' else [])
+        self.near_dups = None
+        if dedupe_path and near_dup_distance is not None:
+            self.near_dups = SimHashIndex(dedupe_path, table='page_simhashes')
+        self._near_dup_lock = threading.Lock()
     
     def search_duckduckgo(self, city, num_results=20):
         """Search DuckDuckGo for web development companies"""
-        query = f"web development company {city}"
-        print(f"Searching DuckDuckGo for: {query}")
-        
-        try:
-            # DuckDuckGo HTML search
-            url = "https://html.duckduckgo.com/html/"
-            data = {'q': query}
-            
-            response = requests.post(url, data=data, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find all result links
-            results = soup.find_all('a', class_='result__a')
-            
-            urls = []
-            for result in results[:num_results]:
-                if 'href' in result.attrs:
-                    url = result['href']
-                    if url.startswith('http'):
-                        urls.append(url)
-            
-            print(f"Found {len(urls)} URLs from DuckDuckGo")
-            return urls
-        
-        except Exception as e:
-            print(f"Error searching DuckDuckGo: {e}")
-            return []
+        return self.search.search_engine('duckduckgo', f"web development company {city}", num_results)
     
     def search_bing(self, city, num_results=20):
         """Search Bing for web development companies"""
-        query = f"web development company {city}"
-        print(f"Searching Bing for: {query}")
-        
-        try:
-            url = f"https://www.bing.com/search?q={query}&count={num_results}"
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find all organic search results
-            results = soup.find_all('li', class_='b_algo')
-            
-            urls = []
-            for result in results:
-                link = result.find('a')
-                if link and 'href' in link.attrs:
-                    url = link['href']
-                    if url.startswith('http') and 'bing.com' not in url:
-                        urls.append(url)
-            
-            print(f"Found {len(urls)} URLs from Bing")
-            return urls
-        
-        except Exception as e:
-            print(f"Error searching Bing: {e}")
-            return []
+        return self.search.search_engine('bing', f"web development company {city}", num_results)
+    
+    def search_all(self, city, num_results=20, engines=None):
+        """Query every search engine (or just `engines`) in parallel, merged in rank order"""
+        return self.search.search(f"web development company {city}", num_results, engines)
     
     def manual_search(self, city):
         """Provide manual search options"""
@@ -98,54 +129,27 @@ class WebDevScraper:
         """Extract basic information from a company website"""
         try:
             print(f"  Extracting info from: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15, allow_redirects=True)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract title
-            title = soup.title.string if soup.title else "N/A"
-            if title:
-                title = title.strip()
-            
-            # Extract meta description
-            description = "N/A"
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and 'content' in meta_desc.attrs:
-                description = meta_desc['content'][:200]
+            # scrape_city's fetcher has already waited for this host's slot
+            page = self._read_page(url, wait=False, max_contact_links=self.max_contact_pages, screen=True)
+            email, phone = page['email'], page['phone']
             
-            # Try to extract email (be more flexible)
-            email = "N/A"
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b'
+            # Check contact page(s) for whatever the landing page is missing
+            if not (email and phone) and not self._dropped(page.get('near_duplicate')):
+                email, phone = self._contacts_from_pages(page['contact_links'], email, phone)
             
-            # Check contact page
-            text_content = soup.get_text()
-            emails = re.findall(email_pattern, text_content)
-            # Filter out common non-business emails
-            business_emails = [e for e in emails if not any(x in e.lower() for x in ['example.com', 'test.com', 'sentry.io'])]
-            if business_emails:
-                email = business_emails[0]
+            email = email or "N/A"
+            phone = phone or "N/A"
             
-            # Try to extract phone
-            phone = "N/A"
-            phone_patterns = [
-                r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-                r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-            ]
-            
-            for pattern in phone_patterns:
-                phones = re.findall(pattern, text_content)
-                if phones:
-                    phone = phones[0] if isinstance(phones[0], str) else ''.join(phones[0])
-                    break
-            
-            return {
+            info = {
                 'url': url,
-                'title': title,
-                'description': description,
+                'title': page['title'],
+                'description': page['description'],
                 'email': email,
                 'phone': phone
             }
+            if page.get('near_duplicate'):
+                info['near_duplicate'] = page['near_duplicate']
+            return info
         
         except Exception as e:
             print(f"  Error: {e}")
@@ -157,28 +161,136 @@ class WebDevScraper:
                 'phone': 'N/A'
             }
     
-    def scrape_city(self, city, method='bing', num_results=20):
-        """Main method to scrape web dev companies in a city"""
+    def _read_page(self, url, wait=True, max_contact_links=0, screen=False):
+        """Fetch an HTML page and its parse_company_page record, reading no more of it than needed"""
+        response = self.transport.request('GET', url, wait, accept=HTML_TYPES, stream=True, timeout=15, allow_redirects=True)
+        screen = screen and (self.near_dups is not None or self.directory_min_domains)
+        page = {'title': 'N/A', 'description': 'N/A', 'email': None, 'phone': None, 'contact_links': []}
+        try:
+            response.raise_for_status()
+            body = self.limits.body(response, truncate=True)
+            parsed, reason = self._read_and_parse(url, response.url, body, max_contact_links, screen)
+            page = parsed or page
+        finally:
+            response.close()
+        if reason:
+            print(f"  {url} looks like a {reason}")
+            page['near_duplicate'] = reason
+        if not isinstance(response, CachedResponse):
+            self.metrics.add_bytes(url, len(body))
+        return page
+    
+    def _read_and_parse(self, url, page_url, body, max_contact_links, screen):
+        """(page, reason): screen, parse the first html_prefix_bytes, then the rest if contacts are missing"""
+        reason = None
+        with self.metrics.timer('download'):
+            html = body.read_until(self.near_dup_bytes if screen else self.html_prefix_bytes)
+        if screen and not body.complete:
+            # Screen on the first few KB only, so the rest of a directory is never downloaded
+            with self.metrics.timer('parse_job'):
+                reason = self._screen(url, self.parser.run(page_fingerprint, html, page_url))
+            if self._dropped(reason):
+                return None, reason
+            screen = False
+            with self.metrics.timer('download'):
+                html = body.read_until(self.html_prefix_bytes)
+        
+        page = self._parse(html, page_url, max_contact_links, screen)
+        if screen:
+            # A page shorter than near_dup_bytes was read whole and fingerprinted by the parse
+            reason = self._screen(url, page.pop('fingerprint'))
+        if (page['email'] and page['phone']) or body.complete or self._dropped(reason):
+            return page, reason
+        
+        with self.metrics.timer('download'):
+            html = body.read_all()
+        return self._parse(html, page_url, max_contact_links), reason
+    
+    def _parse(self, html, page_url, max_contact_links, fingerprint=False):
+        """parse_company_page in the parse pool, recording its worker timings"""
+        with self.metrics.timer('parse_job'):
+            page = self.parser.run(parse_company_page, html, page_url, max_contact_links, fingerprint)
+        for stage, seconds in page.pop('timings').items():
+            self.metrics.observe(stage, seconds)
+        return page
+    
+    def _dropped(self, reason):
+        return reason is not None and self.near_dup_action == 'drop'
+    
+    def _screen(self, url, fingerprint):
+        """Why a landing page is a directory or near-duplicate of another site's page, or None"""
+        if self.directory_min_domains and fingerprint['external_domains'] >= self.directory_min_domains:
+            self.metrics.inc('directory_pages')
+            return f"directory page (links to {fingerprint['external_domains']} other sites)"
+        if self.near_dups is None or fingerprint['simhash'] is None:
+            return None
+        domain = registrable_domain(url)
+        with self._near_dup_lock:
+            matches = [key for key, _ in self.near_dups.near(fingerprint['simhash'], self.near_dup_distance)
+                       if registrable_domain(key) != domain]
+            if not matches:
+                self.near_dups.add(url, fingerprint['simhash'])
+                return None
+        self.metrics.inc('near_duplicates')
+        return f"near-duplicate of {matches[0]}"
+    
+    def _page_contacts(self, url):
+        page = self._read_page(url)
+        return page['email'], page['phone']
+    
+    def _contacts_from_pages(self, links, email, phone):
+        """Fetch contact pages in parallel, filling in email/phone until both are known"""
+        if not links:
+            return email, phone
+        
+        pool = ThreadPoolExecutor(max_workers=len(links))
+        try:
+            futures = [pool.submit(self._page_contacts, link) for link in links]
+            for future in as_completed(futures):
+                try:
+                    page_email, page_phone = future.result()
+                except Exception as e:
+                    print(f"  Error reading contact page: {e}")
+                    continue
+                email = email or page_email
+                phone = phone or page_phone
+                if email and phone:
+                    break
+        finally:
+            # Found everything: don't wait for the slower pages
+            pool.shutdown(wait=False, cancel_futures=True)
+        return email, phone
+    
+    def scrape_city(self, city, method='bing', num_results=20, sink=None):
+        """Main method to scrape web dev companies in a city
+        
+        Each record is written to `sink` (see sinks.py) as soon as it is
+        extracted, and kept in self.results only if keep_results is set.
+        If an earlier run for the same city was interrupted, its search
+        results and finished extractions are taken from the journal.
+        """
         print(f"\n{'='*60}")
         print(f"Scraping Web Development Companies in {city}")
         print(f"{'='*60}\n")
         
-        urls = []
+        scope = f"city:{city.strip().lower()}|{method}|{num_results}"
+        if self.journal is not None and self.journal.has_scope(scope):
+            return self._extract_all(scope, self.journal.unfinished(scope), sink, self.journal.finished(scope))
         
-        if method == 'bing':
-            urls = self.search_bing(city, num_results)
-        elif method == 'duckduckgo':
-            urls = self.search_duckduckgo(city, num_results)
-        elif method == 'manual':
+        if method == 'manual':
             urls = self.manual_search(city)
+        elif method in self.search.providers:
+            urls = self.search_all(city, num_results, [method])
         else:
-            # Try multiple methods
-            urls.extend(self.search_bing(city, num_results))
-            if len(urls) < 5:
-                urls.extend(self.search_duckduckgo(city, num_results))
+            # Query every engine at once
+            urls = self.search_all(city, num_results)
         
-        # Remove duplicates
-        urls = list(set(urls))
+        # One URL per company domain, in rank order, skipping companies scraped before
+        found = len(urls)
+        urls = unique_by_domain(urls, self.dedupe)
+        if found and not urls:
+            print(f"\nAll {found} URLs belong to companies scraped in earlier runs.")
+            return
         
         if not urls:
             print("\nNo results found! Try the manual method or use web directories.")
@@ -187,31 +299,98 @@ class WebDevScraper:
         
         print(f"\nFound {len(urls)} unique URLs. Extracting information...\n")
         
-        # Extract info from each URL
-        for i, url in enumerate(urls, 1):
-            print(f"[{i}/{len(urls)}]")
+        if self.journal is not None:
+            self.journal.add_pending(scope, urls)
+        self._extract_all(scope, urls, sink)
+    
+    def _extract_all(self, scope, urls, sink=None, finished=()):
+        """Extract every URL concurrently, checkpointing each result in the journal"""
+        if finished:
+            print(f"Resuming interrupted run: {len(finished)} done, {len(urls)} remaining\n")
+            if self.keep_results:
+                self.results.extend(info for _, info in finished)
+        
+        # Extract info from each URL, collecting results as they complete
+        scraped = len(finished)
+        # Kept records the sink has not flushed yet; journalled as done only once it has
+        unflushed = []
+        for i, (url, info) in enumerate(self.fetcher.map(self.extract_company_info, urls), 1):
+            print(f"[{i}/{len(urls)}] {url}")
+            self.metrics.set_gauge('pending_companies', len(urls) - i)
+            if isinstance(info, Exception):
+                self.metrics.record_error(url, info)
             
-            info = self.extract_company_info(url)
-            if info:
-                self.results.append(info)
+            kept = bool(info) and not isinstance(info, Exception) and self.is_new_company(info)
+            if self.journal is not None:
+                if isinstance(info, Exception) or not info or info['title'] == 'Error loading':
+                    self.journal.mark_failed(scope, url, info if isinstance(info, Exception) else None)
+                elif not kept:
+                    # Resuming must neither bring the record back nor extract it again
+                    self.journal.mark_skipped(scope, url)
             
-            # Be respectful - add delay between requests
-            time.sleep(3)
+            if kept:
+                scraped += 1
+                unflushed.append((url, info))
+                with self.metrics.timer('write'):
+                    if sink is not None:
+                        sink.write(info)
+                    if self.keep_results:
+                        self.results.append(info)
+                if sink is None or not sink.buffer:
+                    self._mark_done(scope, unflushed)
+        
+        if sink is not None:
+            with self.metrics.timer('write'):
+                sink.flush()
+        self._mark_done(scope, unflushed)
+        
+        # The city is complete; the next run should start fresh
+        if self.journal is not None:
+            self.journal.clear(scope)
         
         print(f"\n{'='*60}")
-        print(f"Successfully scraped {len(self.results)} companies")
+        print(f"Successfully scraped {scraped} companies")
+        print(self.metrics.report())
+        if self.metrics_path:
+            self.metrics.write_json(self.metrics_path)
+            print(f"Run metrics saved to {self.metrics_path}")
         print(f"{'='*60}\n")
     
+    def _mark_done(self, scope, records):
+        """Journal (url, info) records as done once they are safely written, and empty the list"""
+        if self.journal is not None:
+            for url, info in records:
+                self.journal.mark_done(scope, url, info)
+        records.clear()
+    
+    def is_new_company(self, info):
+        """Record a company in the dedupe index; False if it matches one scraped before.
+        
+        Directories and near-duplicate pages are rejected here too unless
+        near_dup_action is 'flag', in which case they are kept with their
+        `near_duplicate` reason.
+        """
+        if info.get('near_duplicate') and self.near_dup_action == 'drop':
+            print(f"  Skipping {info['url']}: {info['near_duplicate']}")
+            return False
+        if self.dedupe is None or info['title'] == 'Error loading':
+            return True
+        duplicate_of = self.dedupe.add(info)
+        # Itself, when a crash lost the record before it was journalled and it is extracted again
+        if duplicate_of and duplicate_of != info['url']:
+            print(f"  Skipping {info['url']}: same company as {duplicate_of}")
+            return False
+        return True
+    
     def save_to_csv(self, filename):
         """Save results to CSV file"""
         if not self.results:
             print("No results to save!")
             return
         
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['url', 'title', 'description', 'email', 'phone'])
-            writer.writeheader()
-            writer.writerows(self.results)
+        with CsvSink(filename, fieldnames=self.fieldnames, append=False, batch_size=len(self.results)) as sink:
+            for result in self.results:
+                sink.write(result)
         
         print(f"✓ Results saved to {filename}")
     
@@ -244,7 +423,7 @@ if __name__ == "__main__":
     print("1. Bing (recommended)")
     print("2. DuckDuckGo")
     print("3. Manual input")
-    print("4. Try all methods")
+    print("4. All search engines at once")
     
     method_choice = input("Choose method (1-4): ").strip()
     
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from dedupe import canonical_url
+
+
+class SearchProvider:
+    """One search engine: builds its request and parses result URLs from the page.
+
+    Subclasses set `name`, `label` and a default `endpoint`, and implement
+    `fetch` and `parse`. `request` is the caller's `request(method, url,
+    **kwargs)` function, so searches share its session, politeness pacing
+    and HTTP cache. `parse` optionally runs the parsing elsewhere, as
+    parse(self.parse, html, num_results) (see parsing.ParsePool.run).
+    Errors propagate to the caller, which keeps failed searches out of the
+    result cache.
+    """
+
+    name = None
+    label = None
+    endpoint = None
+
+    def __init__(self, endpoint=None):
+        if endpoint:
+            self.endpoint = endpoint
+
+    def fetch(self, request, query, num_results):
+        raise NotImplementedError
+
+    def parse(self, html, num_results):
+        raise NotImplementedError
+
+    def search(self, request, query, num_results=20, parse=None):
+        print(f"Searching {self.label} for: {query}")
+        response = self.fetch(request, query, num_results)
+        response.raise_for_status()
+        if parse is not None:
+            urls = parse(self.parse, response.content, num_results)
+        else:
+            urls = self.parse(response.content, num_results)
+        print(f"Found {len(urls)} URLs from {self.label}")
+        return urls
+
+
+class BingProvider(SearchProvider):
+    name = 'bing'
+    label = 'Bing'
+    endpoint = 'https://www.bing.com/search'
+
+    def fetch(self, request, query, num_results):
+        return request('GET', self.endpoint, params={'q': query, 'count': num_results}, timeout=15)
+
+    def parse(self, html, num_results):
+        soup = BeautifulSoup(html, 'html.parser')
+        urls = []
+        # Organic results only
+        for result in soup.find_all('li', class_='b_algo'):
+            link = result.find('a')
+            if link and 'href' in link.attrs:
+                url = link['href']
+                if url.startswith('http') and 'bing.com' not in url:
+                    urls.append(url)
+        return urls[:num_results]
+
+
+class DuckDuckGoProvider(SearchProvider):
+    name = 'duckduckgo'
+    label = 'DuckDuckGo'
+    endpoint = 'https://html.duckduckgo.com/html/'
+
+    def fetch(self, request, query, num_results):
+        return request('POST', self.endpoint, data={'q': query}, timeout=15)
+
+    def parse(self, html, num_results):
+        soup = BeautifulSoup(html, 'html.parser')
+        urls = []
+        for result in soup.find_all('a', class_='result__a')[:num_results]:
+            if 'href' in result.attrs:
+                url = result['href']
+                if url.startswith('http'):
+                    urls.append(url)
+        return urls
+
+
+PROVIDERS = {provider.name: provider for provider in (BingProvider, DuckDuckGoProvider)}
+
+
+class SearchCache:
+    """SQLite-backed TTL cache of result URLs per (engine, query, result count)"""
+
+    def __init__(self, path, ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('''CREATE TABLE IF NOT EXISTS searches (
+            engine TEXT NOT NULL,
+            query TEXT NOT NULL,
+            num_results INTEGER NOT NULL,
+            urls TEXT NOT NULL,
+            expires REAL NOT NULL,
+            PRIMARY KEY (engine, query, num_results)
+        )''')
+        self._db.execute('DELETE FROM searches WHERE expires <= ?', (time.time(),))
+        self._db.commit()
+
+    def _key(self, engine, query, num_results):
+        return engine, ' '.join(query.lower().split()), num_results
+
+    def get(self, engine, query, num_results):
+        """Cached URLs for the search, or None if missing or expired"""
+        with self._lock:
+            row = self._db.execute('SELECT urls FROM searches WHERE engine = ? AND query = ? AND num_results = ? '
+                                   'AND expires > ?', self._key(engine, query, num_results) + (time.time(),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, engine, query, num_results, urls):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO searches (engine, query, num_results, urls, expires) '
+                             'VALUES (?, ?, ?, ?, ?)',
+                             self._key(engine, query, num_results) + (json.dumps(urls), time.time() + self.ttl))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def merge_ranked(result_lists):
+    """Interleave several engines' results by rank, keeping each URL's first appearance"""
+    merged = []
+    seen = set()
+    for rank in range(max((len(urls) for urls in result_lists), default=0)):
+        for urls in result_lists:
+            if rank < len(urls):
+                key = canonical_url(urls[rank])
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(urls[rank])
+    return merged
+
+
+class MultiSearch:
+    """Query several providers at once and merge their results in rank order.
+
+    Each engine's results are cached by query for `cache.ttl` seconds, so a
+    repeated city run skips the search stage. A failing engine contributes
+    nothing (and is not cached) without holding up the others.
+    """
+
+    def __init__(self, providers, request, cache=None, parse=None):
+        self.providers = providers
+        self.request = request
+        self.cache = cache
+        self.parse = parse
+
+    def search_engine(self, engine, query, num_results=20):
+        if self.cache is not None:
+            urls = self.cache.get(engine, query, num_results)
+            if urls is not None:
+                print(f"Using cached {self.providers[engine].label} results for: {query} ({len(urls)} URLs)")
+                return urls
+        try:
+            urls = self.providers[engine].search(self.request, query, num_results, self.parse)
+        except Exception as e:
+            print(f"Error searching {self.providers[engine].label}: {e}")
+            return []
+        if self.cache is not None:
+            self.cache.put(engine, query, num_results, urls)
+        return urls
+
+    def search(self, query, num_results=20, engines=None):
+        """Merged, de-duplicated URLs from every engine (all registered ones by default)"""
+        engines = list(engines or self.providers)
+        if len(engines) == 1:
+            return self.search_engine(engines[0], query, num_results)
+        with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+            result_lists = list(pool.map(lambda engine: self.search_engine(engine, query, num_results), engines))
+        return merge_ranked(result_lists)
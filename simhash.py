@@ -0,0 +1,101 @@
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+
+BITS = 64
+
+
+def feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(features):
+    """64-bit SimHash of an iterable of string features, or of a {feature: weight} dict.
+
+    Similar feature sets give hashes that differ in few bits, so the
+    Hamming distance between two hashes estimates how alike the inputs are.
+    """
+    if not isinstance(features, dict):
+        features = Counter(features)
+    ones = [0] * BITS
+    total = 0
+    for feature, weight in features.items():
+        value = feature_hash(feature)
+        total += weight
+        for bit in range(BITS):
+            if value >> bit & 1:
+                ones[bit] += weight
+    # A bit is set when the features voting for it outweigh those against it
+    return sum(1 << bit for bit in range(BITS) if 2 * ones[bit] > total)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def _unsigned(value):
+    return value + (1 << BITS) if value < 0 else value
+
+
+class SimHashIndex:
+    """Persistent SimHash fingerprints by key, searchable by Hamming distance.
+
+    Each hash is also stored as `bands` equal blocks in indexed columns. Two
+    hashes at most bands - 1 bits apart share at least one block exactly, so
+    near() only compares the rows matching one of the query's blocks instead
+    of scanning the table (larger distances are found on a best-effort basis).
+    """
+
+    def __init__(self, path, table='simhashes', bands=4):
+        self.path = path
+        self.table = table
+        self.bands = bands
+        self.band_bits = BITS // bands
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        band_columns = ''.join(f', b{i} INTEGER NOT NULL' for i in range(bands))
+        self._db.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, hash INTEGER NOT NULL{band_columns})')
+        for i in range(bands):
+            self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_b{i} ON {table} (b{i})')
+        self._db.commit()
+
+    def _blocks(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [value >> (i * self.band_bits) & mask for i in range(self.bands)]
+
+    def add(self, key, value):
+        columns = ''.join(f', b{i}' for i in range(self.bands))
+        placeholders = ', ?' * self.bands
+        with self._lock:
+            self._db.execute(f'INSERT OR REPLACE INTO {self.table} (key, hash{columns}) VALUES (?, ?{placeholders})',
+                             [key, _signed(value)] + self._blocks(value))
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(f'SELECT hash FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        return _unsigned(row[0]) if row else None
+
+    def near(self, value, max_distance=3, limit=10):
+        """[(key, distance)] of stored hashes within max_distance bits of value, closest first"""
+        where = ' OR '.join(f'b{i} = ?' for i in range(self.bands))
+        with self._lock:
+            rows = self._db.execute(f'SELECT key, hash FROM {self.table} WHERE {where}', self._blocks(value)).fetchall()
+        matches = [(key, hamming(value, _unsigned(stored))) for key, stored in rows]
+        matches = sorted((match for match in matches if match[1] <= max_distance), key=lambda match: match[1])
+        return matches[:limit]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,66 @@
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HTML_EXTENSIONS = ('.html', '.htm')
+
+
+def iter_sources(inputs):
+    """URLs and HTML file paths from the command line: URLs, .html files, directories or lists of either"""
+    for item in inputs:
+        if item.startswith(('http://', 'https://')):
+            yield item
+        elif os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if name.lower().endswith(HTML_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif item.lower().endswith(HTML_EXTENSIONS):
+            yield item
+        else:
+            with open(item, encoding='utf-8') as f:
+                yield from iter_sources(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+
+def fetch_html(url, timeout=15):
+    try:
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+    except Exception as e:
+        print(f"Error fetching URL: {e}", file=sys.stderr)
+        return None
+
+
+def load_html(source):
+    """A page's HTML from its URL or file path, or None if it could not be fetched"""
+    if source.startswith(('http://', 'https://')):
+        return fetch_html(source)
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def parse_sources(sources, func, parser, workers=16, *args):
+    """Yield (source, func(html, *args)) for every source, in order.
+
+    Pages are fetched or read on `workers` threads and func runs in
+    `parser` (a parsing.ParsePool); the result is None for pages that
+    could not be loaded. At most a few jobs per worker are in flight, so
+    memory stays flat on inputs of any length.
+    """
+    def job(source):
+        html = load_html(source)
+        return source, None if html is None else parser.run(func, html, *args)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for source in sources:
+            pending.append(pool.submit(job, source))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
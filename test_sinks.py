@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sinks import FIELDNAMES, DbSink
+
+
+def company(url, title='Title', **fields):
+    return dict({'url': url, 'title': title, 'description': 'd', 'email': 'e', 'phone': 'p'}, **fields)
+
+
+class DbSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'companies.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute('SELECT url, title FROM companies ORDER BY url').fetchall()
+        finally:
+            conn.close()
+
+    def test_duplicate_key_in_one_batch_keeps_last(self):
+        with DbSink(self.path, batch_size=10, flush_interval=60) as sink:
+            sink.write(company('https://a.com', 'first'))
+            sink.write(company('https://b.com'))
+            sink.write(company('https://a.com', 'second'))
+        self.assertEqual(self.rows(), [('https://a.com', 'second'), ('https://b.com', 'Title')])
+
+    def test_duplicate_key_across_batches_updates(self):
+        with DbSink(self.path, batch_size=1) as sink:
+            sink.write(company('https://a.com', 'first'))
+            sink.write(company('https://a.com', 'second'))
+        with DbSink(self.path) as sink:
+            sink.write(company('https://a.com', 'third'))
+        self.assertEqual(self.rows(), [('https://a.com', 'third')])
+
+    def test_rows_without_url_are_skipped(self):
+        with DbSink(self.path, flush_interval=60) as sink:
+            sink.write(company(None))
+            sink.write(company(''))
+            sink.write(company('https://a.com'))
+            self.assertEqual(sink.written, 0)
+        self.assertEqual(sink.written, 1)
+        self.assertEqual(self.rows(), [('https://a.com', 'Title')])
+
+    def test_batches_are_chunked_under_the_parameter_limit(self):
+        count = DbSink.SQLITE_MAX_PARAMS // len(FIELDNAMES) * 2 + 7
+        statements = []
+        with DbSink(self.path, batch_size=count, flush_interval=60) as sink:
+            with sink.pool.connection() as conn:
+                conn.set_trace_callback(lambda sql: sql.startswith('INSERT') and statements.append(sql))
+            for i in range(count):
+                sink.write(company(f'https://site{i}.com'))
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(all(sql.count('?') <= DbSink.SQLITE_MAX_PARAMS for sql in statements))
+        self.assertEqual(len(self.rows()), count)
+
+    def test_missing_columns_are_added(self):
+        with DbSink(self.path) as sink:
+            sink.write(company('https://a.com'))
+        with DbSink(self.path, fieldnames=FIELDNAMES + ['near_duplicate']) as sink:
+            sink.write(company('https://b.com', near_duplicate='directory'))
+        conn = sqlite3.connect(self.path)
+        try:
+            flagged = conn.execute('SELECT url, near_duplicate FROM companies ORDER BY url').fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(flagged, [('https://a.com', None), ('https://b.com', 'directory')])
+
+
+if __name__ == '__main__':
+    unittest.main()
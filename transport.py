@@ -0,0 +1,218 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from httpcache import CachedResponse
+
+
+class DnsCache:
+    """TTL cache in front of socket.getaddrinfo.
+
+    Every new pooled connection resolves its host again; with many short
+    company sites and search pages that is a system resolver round trip per
+    connection. Only successful lookups are cached, so a failing host is
+    retried on its next connection. Lookups made inside observed(metrics)
+    are reported to that Metrics.
+    """
+
+    def __init__(self, ttl=300, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        # The Metrics the current thread's lookups are reported to
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._resolve = socket.getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        metrics = getattr(self._local, 'metrics', None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                if metrics is not None:
+                    metrics.inc('dns_cache_hits')
+                return entry[1]
+        start = time.perf_counter()
+        result = self._resolve(host, port, family, type, proto, flags)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            if metrics is not None:
+                metrics.observe('dns', elapsed)
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    @contextmanager
+    def observed(self, metrics):
+        """Report this thread's lookups to metrics until the block exits"""
+        previous = getattr(self._local, 'metrics', None)
+        self._local.metrics = metrics
+        try:
+            yield
+        finally:
+            self._local.metrics = previous
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_dns_cache = None
+_dns_lock = threading.Lock()
+
+
+def install_dns_cache(ttl=300):
+    """Route this process's hostname lookups through a shared DnsCache (installed once)"""
+    global _dns_cache
+    with _dns_lock:
+        if _dns_cache is None:
+            _dns_cache = DnsCache(ttl)
+            socket.getaddrinfo = _dns_cache.getaddrinfo
+        else:
+            _dns_cache.ttl = ttl
+    return _dns_cache
+
+
+class ObservedAdapter(HTTPAdapter):
+    """HTTPAdapter that reports the DNS lookups of its requests to its own Metrics.
+
+    The DnsCache is shared by the whole process; scoping the report to the
+    sending thread keeps two scrapers in one process from counting each
+    other's lookups.
+    """
+
+    def __init__(self, dns_cache, metrics, **kwargs):
+        self.dns_cache = dns_cache
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        with self.dns_cache.observed(self.metrics):
+            return super().send(request, **kwargs)
+
+
+def make_session(user_agent=None, pool_connections=10, pool_maxsize=10, max_retries=0,
+                 compress=True, dns_ttl=300, metrics=None):
+    """Build a requests.Session with keep-alive connection pools sized for the caller.
+
+    `pool_connections` is how many hosts keep a pool at once, `pool_maxsize`
+    how many idle keep-alive connections each host's pool holds (it should be
+    at least the number of threads that talk to one host). Compressed
+    transfer (gzip/deflate, plus br/zstd when urllib3 can decode them) is
+    requested explicitly so a caller's own headers cannot drop it. Pass
+    dns_ttl=0 to leave hostname resolution uncached. With `metrics` (see
+    metrics.py), every response's status and time to headers is recorded,
+    and so are the session's DNS lookups.
+    """
+    session = requests.Session()
+    dns_cache = install_dns_cache(dns_ttl) if dns_ttl else None
+    if dns_cache is not None and metrics is not None:
+        adapter = ObservedAdapter(dns_cache, metrics, pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize, max_retries=max_retries)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    session.headers['Connection'] = 'keep-alive'
+    if compress:
+        session.headers['Accept-Encoding'] = make_headers(accept_encoding=True)['accept-encoding']
+    else:
+        session.headers['Accept-Encoding'] = 'identity'
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+
+    if metrics is not None:
+        session.hooks['response'].append(metrics.on_response)
+    return session
+
+
+class Transport:
+    """The request path both scrapers share.
+
+    Every request waits for its host's slot in a PolitenessScheduler, is
+    sent through a RequestPolicy (adaptive timeouts, retries, hedging) and
+    reports its status back to the scheduler. The body is always streamed:
+    responses whose Content-Type is not in `accept` are dropped after the
+    headers, and unless the caller asked for stream=True the body is read
+    here, up to its type's size cap. GETs go through the HTTP cache when
+    there is one. Errors, transfer times and bytes go to `metrics`.
+    """
+
+    def __init__(self, session, scheduler, policy, limits, metrics, cache=None):
+        self.session = session
+        self.scheduler = scheduler
+        self.policy = policy
+        self.limits = limits
+        self.metrics = metrics
+        self.cache = cache
+
+    def send(self, method, url, wait=True, accept=None, **kwargs):
+        """One network request; `timeout` is the deadline for all of its attempts together.
+
+        wait=False skips the politeness wait for the first attempt, for
+        callers that have already reserved the host's slot (retries and
+        hedges still wait).
+        """
+        stream = kwargs.pop('stream', False)
+        deadline = kwargs.pop('timeout', None)
+
+        def pace(retry):
+            if wait or retry:
+                with self.metrics.timer('wait'):
+                    self.scheduler.wait(url)
+
+        def attempt(timeout):
+            response = self.session.request(method, url, stream=True, timeout=timeout, **kwargs)
+            self.scheduler.record(url, response.status_code, response.headers)
+            return response
+
+        try:
+            response = self.policy.send(attempt, url, method, deadline, pace)
+        except Exception as e:
+            self.metrics.record_error(url, e)
+            raise
+        try:
+            self.limits.check(response, accept)
+            if not stream:
+                self.read_body(url, response)
+        except Exception as e:
+            self.metrics.record_error(url, e)
+            response.close()
+            raise
+        return response
+
+    def get(self, url, **kwargs):
+        return self.send('GET', url, **kwargs)
+
+    def read_body(self, url, response):
+        """Read a streaming body up to its cap, timing the transfer and counting its bytes"""
+        with self.metrics.timer('download'):
+            body = self.limits.read(response)
+        self.metrics.add_bytes(url, len(body))
+
+    def request(self, method, url, wait=True, **kwargs):
+        """Send a request, answering GETs from the HTTP cache when possible"""
+        if method != 'GET' or self.cache is None:
+            return self.send(method, url, wait, **kwargs)
+        stream = kwargs.get('stream', False)
+        response = self.cache.get(lambda url, **kw: self.send('GET', url, wait, **kw), url, **kwargs)
+        if not isinstance(response, CachedResponse) and not stream:
+            # Not answered from the cache, so still streaming: read it here, within the size cap
+            self.read_body(url, response)
+        return response
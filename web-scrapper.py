@@ -1,32 +1,110 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import re
+import hashlib
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urljoin, urlparse
-import time
 import logging
 from pathlib import Path
+from politeness import PolitenessScheduler
+from downloader import StreamingDownloader
+from assetstore import AssetStore
+from httpcache import HttpCache
+from parsing import ParsePool, template_page, unlink_pages
+from cssrefs import FONT_EXTENSIONS, IMAGE_EXTENSIONS, css_references, rewrite_css
+from journal import Journal
+from frontier import BloomFilter, PageLinks, UrlFrontier, normalize_url
+from transport import Transport, make_session
+from requestpolicy import RequestPolicy
+from metrics import Metrics
+from limits import HTML_TYPES, ResponseLimits, UnwantedContentType
+
+# Links with these extensions are downloads, not pages worth crawling
+NON_PAGE_EXTENSIONS = {
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.jpg', '.jpeg', '.png',
+    '.gif', '.svg', '.webp', '.ico', '.css', '.js', '.mp3', '.mp4', '.avi', '.mov', '.doc',
+    '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.xml', '.json', '.txt',
+}
 
 class WebsiteScraper:
-    def __init__(self, base_url, output_dir="scraped_website"):
+    def __init__(self, base_url, output_dir="scraped_website", requests_per_second=10,
+                 max_workers=8, max_in_flight_bytes=8 * 1024 * 1024, store_dir=None,
+                 use_cache=True, cache_dir=None, cache_max_bytes=512 * 1024 * 1024,
+                 use_journal=True, dns_ttl=300, metrics_port=None, limits=None, parse_workers=None,
+                 retries=2, retry_ratio=0.1, hedge_quantile=0.95):
         self.base_url = base_url
         self.output_dir = output_dir
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        
+        # Create output directory first: the journal, cache and asset store live in it
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        
+        # Per-stage timings, bytes and per-host status counts; saved to
+        # metrics.json after each run and optionally served to Prometheus
+        self.metrics = Metrics()
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+        
+        # Pages and assets are streamed under per-type size caps
+        self.limits = limits or ResponseLimits()
+        
+        # Pages are parsed once, in worker processes (one per core by default,
+        # 0 for in-thread) so crawl workers are not held by the GIL; the
+        # rewrite only fills in the template that comes back
+        self.parser = ParsePool(parse_workers)
+        
+        # Let every download worker keep its own pooled keep-alive connection
+        self.session = make_session(
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            pool_maxsize=max_workers, dns_ttl=dns_ttl, metrics=self.metrics)
+        
+        # Pace requests per host instead of sleeping between every download
+        self.scheduler = PolitenessScheduler(rate=requests_per_second, burst=requests_per_second,
+                                             user_agent=self.session.headers['User-Agent'],
+                                             session=self.session)
+        
+        # Asset bodies are stored once by content hash and hardlinked into the mirror;
+        # point several scrapers at one store_dir to share it between sites
+        self.store = AssetStore(store_dir or os.path.join(self.output_dir, '.assets'))
+        
+        # Re-runs revalidate pages and assets instead of downloading them again
+        self.cache = None
+        if use_cache:
+            self.cache = HttpCache(cache_dir or os.path.join(self.output_dir, '.http_cache'), cache_max_bytes)
+        
+        # Pages and assets share one request path (see transport.Transport)
+        self.policy = RequestPolicy(retries, retry_ratio=retry_ratio, hedge_quantile=hedge_quantile,
+                                    metrics=self.metrics)
+        self.transport = Transport(self.session, self.scheduler, self.policy, self.limits, self.metrics, self.cache)
+        
+        # Assets are fetched in parallel and streamed to disk under a byte budget
+        self.downloader = StreamingDownloader(self.transport.get, max_workers=max_workers,
+                                              max_in_flight_bytes=max_in_flight_bytes,
+                                              store=self.store, cache=self.cache, metrics=self.metrics,
+                                              limits=self.limits)
+        
+        # Finished downloads are checkpointed so an interrupted mirror resumes
+        self.journal = Journal(os.path.join(self.output_dir, '.journal.sqlite')) if use_journal else None
+        self.journal_scope = f"site:{self.base_url}"
+        
+        # Assets already scheduled this run, shared by every mirrored page
+        # (Future, relative path) while an asset downloads, (succeeded, relative path) after
+        self._assets = {}
+        # File names taken; a false positive only adds a hash to a name, so a Bloom filter will do
+        self._asset_files = BloomFilter()
+        self._assets_lock = threading.Lock()
+        # Stylesheets whose url()/@import references have been followed this run
+        self._stylesheets_done = set()
         
         # Setup logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
-        # Create output directory
-        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
-        
     def get_page_content(self, url):
         """Fetch the content of a webpage"""
         try:
-            response = self.session.get(url, timeout=30)
+            response = self.transport.request('GET', url, accept=HTML_TYPES, timeout=30)
             response.raise_for_status()
             return response.text
         except requests.exceptions.RequestException as e:
@@ -35,65 +113,30 @@ class WebsiteScraper:
     
     def download_file(self, url, local_path):
         """Download a file from URL to local path"""
+        if self.journal is not None and self.journal.result(self.journal_scope, url) == local_path \
+                and os.path.exists(local_path):
+            self.logger.info(f"Already downloaded: {url} -> {local_path}")
+            return True
+        
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            
+            self.downloader.fetch(url, local_path, timeout=30)
             self.logger.info(f"Downloaded: {url} -> {local_path}")
+            if self.journal is not None:
+                self.journal.mark_done(self.journal_scope, url, local_path)
             return True
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error downloading {url}: {e}")
+            self.metrics.record_error(url, e)
+            if self.journal is not None:
+                self.journal.mark_failed(self.journal_scope, url, e)
             return False
     
-    def extract_css_links(self, soup):
-        """Extract CSS file links from HTML"""
-        css_links = []
-        
-        # External CSS files
-        for link in soup.find_all('link', {'rel': 'stylesheet'}):
-            href = link.get('href')
-            if href:
-                css_links.append(urljoin(self.base_url, href))
-        
-        # Inline CSS
-        for style in soup.find_all('style'):
-            if style.string:
-                css_links.append(('inline', style.string))
-        
-        return css_links
-    
-    def extract_js_links(self, soup):
-        """Extract JavaScript file links from HTML"""
-        js_links = []
-        
-        # External JS files
-        for script in soup.find_all('script', {'src': True}):
-            src = script.get('src')
-            if src:
-                js_links.append(urljoin(self.base_url, src))
-        
-        # Inline JavaScript
-        for script in soup.find_all('script'):
-            if script.string and not script.get('src'):
-                js_links.append(('inline', script.string))
-        
-        return js_links
-    
-    def extract_image_links(self, soup):
-        """Extract image links from HTML"""
-        image_links = []
-        
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                image_links.append(urljoin(self.base_url, src))
-        
-        return image_links
+    def is_site_page(self, url):
+        """True if url is an HTML page on the site being mirrored"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower() != urlparse(self.base_url).netloc.lower():
+            return False
+        return os.path.splitext(parsed.path)[1].lower() not in NON_PAGE_EXTENSIONS
     
     def sanitize_filename(self, url):
         """Create a safe filename from URL"""
@@ -105,130 +148,245 @@ class WebsiteScraper:
         
         # Remove invalid characters
         filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        
+        # Files that differ only by query string must not share a name
+        if parsed.query:
+            root, extension = os.path.splitext(filename)
+            filename = f"{root}_{hashlib.sha1(parsed.query.encode('utf-8')).hexdigest()[:8]}{extension}"
         return filename
     
-    def update_html_links(self, html_content, css_files, js_files, image_files):
-        """Update HTML to point to local files"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Update CSS links
-        for link in soup.find_all('link', {'rel': 'stylesheet'}):
-            href = link.get('href')
-            if href:
-                full_url = urljoin(self.base_url, href)
-                if full_url in css_files:
-                    local_path = css_files[full_url]
-                    link['href'] = local_path
-        
-        # Update JavaScript links
-        for script in soup.find_all('script', {'src': True}):
-            src = script.get('src')
-            if src:
-                full_url = urljoin(self.base_url, src)
-                if full_url in js_files:
-                    local_path = js_files[full_url]
-                    script['src'] = local_path
-        
-        # Update image links
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                full_url = urljoin(self.base_url, src)
-                if full_url in image_files:
-                    local_path = image_files[full_url]
-                    img['src'] = local_path
-        
-        return str(soup)
+    def page_path(self, url):
+        """Path, relative to output_dir, that a mirrored page is saved under"""
+        parsed = urlparse(url)
+        if normalize_url(url) == normalize_url(self.base_url) or (parsed.path in ('', '/') and not parsed.query):
+            return 'index.html'
+        
+        path = parsed.path or '/'
+        if path.endswith('/'):
+            path += 'index.html'
+        elif os.path.splitext(path)[1].lower() not in ('.html', '.htm'):
+            path += '.html'
+        
+        # Pages that differ only by query string get distinct files
+        if parsed.query:
+            root, extension = os.path.splitext(path)
+            path = f"{root}_{hashlib.sha1(parsed.query.encode('utf-8')).hexdigest()[:8]}{extension}"
+        
+        path = re.sub(r'[<>:"\\|?*]', '_', path.lstrip('/'))
+        return f"pages/{path}"
     
-    def scrape_website(self):
-        """Main scraping function"""
-        self.logger.info(f"Starting to scrape: {self.base_url}")
+    def _download_asset(self, url, subdir, extension=None):
+        """Schedule a download of url unless another page already did; return (state, relative path).
         
-        # Get main HTML content
-        html_content = self.get_page_content(self.base_url)
-        if not html_content:
-            self.logger.error("Failed to fetch main page")
-            return
+        state is the download's Future, or whether it succeeded once it is
+        over; pass it to _downloaded.
+        """
+        with self._assets_lock:
+            entry = self._assets.get(url)
+            future = None
+            if entry is None:
+                filename = self.sanitize_filename(url)
+                if extension and not filename.endswith(extension):
+                    filename += extension
+                
+                # Same file name from a different path (/a/logo.png vs /b/logo.png): disambiguate
+                if os.path.join(subdir, filename) in self._asset_files:
+                    root, ext = os.path.splitext(filename)
+                    filename = f"{root}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}{ext}"
+                
+                relative_path = f"{subdir}/{filename}"
+                self._asset_files.add(os.path.join(subdir, filename))
+                future = self.downloader.submit(url, os.path.join(self.output_dir, subdir, filename), self.download_file)
+                entry = (future, relative_path)
+                self._assets[url] = entry
+        if future is not None:
+            # Outside the lock: the callback runs right here if the download is already over
+            future.add_done_callback(lambda done: self._asset_done(url, relative_path, done))
+        return entry
+    
+    def _asset_done(self, url, relative_path, future):
+        """Keep only the outcome of a finished download, not its Future"""
+        if not future.cancelled() and future.exception() is None:
+            with self._assets_lock:
+                self._assets[url] = (future.result(), relative_path)
+    
+    def _downloaded(self, state):
+        """True if an asset's download succeeded, waiting for it if it is still running"""
+        return state if isinstance(state, bool) else state.result()
+    
+    def _asset_subdir(self, url):
+        """Mirror directory for an asset referenced from CSS, by file extension"""
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension == '.css':
+            return 'css'
+        if extension in IMAGE_EXTENSIONS:
+            return 'images'
+        if extension in FONT_EXTENSIONS:
+            return 'fonts'
+        return 'media'
+    
+    def _download_css_refs(self, css_text, base_url):
+        """Schedule every url()/@import target of css_text; return [(url, is_import, state, relative path)]"""
+        scheduled = []
+        for url, is_import in css_references(css_text, base_url):
+            subdir = 'css' if is_import else self._asset_subdir(url)
+            state, relative_path = self._download_asset(url, subdir, '.css' if is_import else None)
+            scheduled.append((url, is_import, state, relative_path))
+        return scheduled
+    
+    def _local_css_paths(self, scheduled, from_dir, stylesheets):
+        """Map each successfully downloaded reference to its path relative to from_dir.
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        Imported stylesheets are appended to `stylesheets` so their own
+        references get followed too.
+        """
+        local_paths = {}
+        for url, is_import, state, relative_path in scheduled:
+            if self._downloaded(state):
+                local_paths[url] = posixpath.relpath(relative_path, from_dir)
+                if is_import:
+                    stylesheets.append((url, relative_path))
+        return local_paths
+    
+    def _process_stylesheets(self, stylesheets):
+        """Download what stylesheets reference through url()/@import and point them at the local copies.
         
-        # Extract all resource links
-        css_links = self.extract_css_links(soup)
-        js_links = self.extract_js_links(soup)
-        image_links = self.extract_image_links(soup)
+        `stylesheets` holds (url, relative path) of downloaded CSS files. This
+        runs on the page's thread, never on a download worker, so waiting for
+        the referenced files cannot starve the download pool. Every stylesheet
+        is handled once per run, and imported ones are followed in turn. The
+        original text comes from the asset store and the rewritten CSS
+        replaces the mirror's hardlink, so the shared blob is never modified.
+        """
+        stylesheets = list(stylesheets)
+        while stylesheets:
+            css_url, relative_path = stylesheets.pop()
+            with self._assets_lock:
+                if css_url in self._stylesheets_done:
+                    continue
+                self._stylesheets_done.add(css_url)
+            
+            local_path = os.path.join(self.output_dir, relative_path)
+            digest = self.store.lookup(css_url)
+            source_path = self.store.object_path(digest) if digest else local_path
+            # surrogateescape round-trips stylesheets that are not valid UTF-8
+            with open(source_path, encoding='utf-8', errors='surrogateescape') as f:
+                text = f.read()
+            
+            scheduled = self._download_css_refs(text, css_url)
+            if not scheduled:
+                continue
+            local_paths = self._local_css_paths(scheduled, posixpath.dirname(relative_path), stylesheets)
+            
+            part_path = local_path + '.part'
+            with open(part_path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                f.write(rewrite_css(text, css_url, local_paths))
+            os.replace(part_path, local_path)
+            self.logger.info(f"Rewrote {len(local_paths)} references in {relative_path}")
+    
+    def _scan_page(self, html, page_url):
+        """Parse a page, in a worker if there is a parse pool; returns (scan, PageTemplate)"""
+        with self.metrics.timer('parse'):
+            return self.parser.run(template_page, html, page_url)
+    
+    def _mirror_page(self, html, page_url, html_path, page_files=None):
+        """Download a page's assets (once per run) and save it with links rewritten"""
+        scan, template = self._scan_page(html, page_url)
+        return self._mirror_scanned(page_url, scan, template, html_path, page_files)
+    
+    def _mirror_scanned(self, page_url, scan, template, html_path, page_files=None):
+        """Download the assets of a scanned page (once per run) and save it with links rewritten"""
+        css_links = scan['css']
+        js_links = scan['js']
+        image_links = scan['images']
+        media_links = scan['media']
         
         # Track downloaded files
         downloaded_css = {}
         downloaded_js = {}
         downloaded_images = {}
+        downloaded_media = {}
         
-        # Download CSS files
-        css_dir = os.path.join(self.output_dir, 'css')
-        os.makedirs(css_dir, exist_ok=True)
-        
-        for i, css_link in enumerate(css_links):
-            if isinstance(css_link, tuple) and css_link[0] == 'inline':
-                # Save inline CSS
-                filename = f"inline_style_{i}.css"
-                local_path = os.path.join(css_dir, filename)
-                with open(local_path, 'w', encoding='utf-8') as f:
-                    f.write(css_link[1])
-                self.logger.info(f"Saved inline CSS: {local_path}")
-            else:
-                # Download external CSS
-                filename = self.sanitize_filename(css_link)
-                if not filename.endswith('.css'):
-                    filename += '.css'
-                
-                local_path = os.path.join(css_dir, filename)
-                if self.download_file(css_link, local_path):
-                    downloaded_css[css_link] = f"css/{filename}"
-                
-                time.sleep(0.1)  # Be respectful to the server
-        
-        # Download JavaScript files
-        js_dir = os.path.join(self.output_dir, 'js')
-        os.makedirs(js_dir, exist_ok=True)
-        
-        for i, js_link in enumerate(js_links):
-            if isinstance(js_link, tuple) and js_link[0] == 'inline':
-                # Save inline JavaScript
-                filename = f"inline_script_{i}.js"
-                local_path = os.path.join(js_dir, filename)
-                with open(local_path, 'w', encoding='utf-8') as f:
-                    f.write(js_link[1])
-                self.logger.info(f"Saved inline JavaScript: {local_path}")
-            else:
-                # Download external JavaScript
-                filename = self.sanitize_filename(js_link)
-                if not filename.endswith('.js'):
-                    filename += '.js'
-                
-                local_path = os.path.join(js_dir, filename)
-                if self.download_file(js_link, local_path):
-                    downloaded_js[js_link] = f"js/{filename}"
-                
-                time.sleep(0.1)  # Be respectful to the server
+        # Inline files of pages other than the start page are tagged with the page
+        inline_suffix = '' if html_path == 'index.html' else '_' + hashlib.sha1(html_path.encode('utf-8')).hexdigest()[:8]
         
-        # Download images
-        img_dir = os.path.join(self.output_dir, 'images')
-        os.makedirs(img_dir, exist_ok=True)
+        # Queue every external asset; inline CSS/JS is written straight away
+        pending = []
+        asset_types = [
+            ('css', css_links, '.css', 'inline_style', 'CSS', downloaded_css),
+            ('js', js_links, '.js', 'inline_script', 'JavaScript', downloaded_js),
+            ('images', image_links, None, None, 'image', downloaded_images),
+            ('media', media_links, None, None, 'media', downloaded_media),
+        ]
         
-        for img_link in image_links:
-            filename = self.sanitize_filename(img_link)
-            local_path = os.path.join(img_dir, filename)
-            if self.download_file(img_link, local_path):
-                downloaded_images[img_link] = f"images/{filename}"
+        for subdir, links, extension, inline_prefix, label, downloaded in asset_types:
+            asset_dir = os.path.join(self.output_dir, subdir)
+            os.makedirs(asset_dir, exist_ok=True)
             
-            time.sleep(0.1)  # Be respectful to the server
+            for i, link in enumerate(links):
+                if isinstance(link, tuple) and link[0] == 'inline':
+                    filename = f"{inline_prefix}{inline_suffix}_{i}{extension}"
+                    local_path = os.path.join(asset_dir, filename)
+                    with open(local_path, 'w', encoding='utf-8') as f:
+                        f.write(link[1])
+                    self.logger.info(f"Saved inline {label}: {local_path}")
+                    continue
+                
+                state, relative_path = self._download_asset(link, subdir, extension)
+                pending.append((link, state, relative_path, downloaded))
+        
+        # Files referenced from inline CSS (<style> blocks and style attributes)
+        inline_styles = [(text, self._download_css_refs(text, page_url)) for text in scan['styles']]
+        
+        # CSS, JavaScript and images download concurrently on the shared pool
+        page_dir = posixpath.dirname(html_path) or '.'
+        stylesheets = []
+        for link, state, relative_path, downloaded in pending:
+            if self._downloaded(state):
+                downloaded[link] = posixpath.relpath(relative_path, page_dir)
+                if downloaded is downloaded_css:
+                    stylesheets.append((link, relative_path))
+        
+        # Fonts, backgrounds and imports referenced from the CSS join the same pool
+        styles = []
+        with self.metrics.timer('css'):
+            for text, scheduled in inline_styles:
+                local_paths = self._local_css_paths(scheduled, page_dir, stylesheets)
+                styles.append(rewrite_css(text, page_url, local_paths))
+            self._process_stylesheets(stylesheets)
         
         # Update HTML to use local files
-        updated_html = self.update_html_links(html_content, downloaded_css, downloaded_js, downloaded_images)
+        with self.metrics.timer('rewrite'):
+            local_paths = {'css': downloaded_css, 'js': downloaded_js, 'images': downloaded_images,
+                           'media': downloaded_media}
+            if page_files:
+                page_files = {url: posixpath.relpath(path, page_dir) for url, path in page_files.items()}
+            html = template.fill(local_paths, styles, page_files, key=normalize_url)
         
         # Save updated HTML
-        html_path = os.path.join(self.output_dir, 'index.html')
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(updated_html)
+        local_html_path = os.path.join(self.output_dir, html_path)
+        os.makedirs(os.path.dirname(local_html_path), exist_ok=True)
+        with self.metrics.timer('write'):
+            with open(local_html_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+        
+        return downloaded_css, downloaded_js, downloaded_images
+    
+    def scrape_website(self):
+        """Main scraping function"""
+        self.logger.info(f"Starting to scrape: {self.base_url}")
+        
+        # Get main HTML content
+        html_content = self.get_page_content(self.base_url)
+        if not html_content:
+            self.logger.error("Failed to fetch main page")
+            return
+        
+        downloaded_css, downloaded_js, downloaded_images = self._mirror_page(html_content, self.base_url, 'index.html')
+        
+        # The mirror is complete; the next run should start fresh
+        if self.journal is not None:
+            self.journal.clear(self.journal_scope)
         
         self.logger.info(f"Scraping completed! Files saved to: {self.output_dir}")
         
@@ -240,6 +398,116 @@ class WebsiteScraper:
         print(f"JavaScript files downloaded: {len(downloaded_js)}")
         print(f"Images downloaded: {len(downloaded_images)}")
         print(f"Main HTML saved as: index.html")
+        self._save_metrics()
+    
+    def _crawl_page(self, url, follow_links):
+        """Mirror one crawled page; return the same-site links found on it, or None on failure"""
+        try:
+            response = self.transport.request('GET', url, accept=HTML_TYPES, timeout=30)
+            response.raise_for_status()
+        except UnwantedContentType:
+            self.logger.info(f"Skipping non-HTML page: {url}")
+            return None
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Error fetching {url}: {e}")
+            return None
+        
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            self.logger.info(f"Skipping non-HTML page: {url}")
+            return None
+        
+        html = response.text
+        scan, template = self._scan_page(html, url)
+        
+        page_links = [link for link in scan['pages'] if self.is_site_page(link)] if follow_links else []
+        page_files = {normalize_url(link): self.page_path(link) for link in page_links}
+        
+        self._mirror_scanned(url, scan, template, self.page_path(url), page_files)
+        self.logger.info(f"Mirrored page: {url}")
+        return page_links
+    
+    def crawl_website(self, max_pages=100, max_depth=3, page_workers=4):
+        """Mirror every same-site page reachable from base_url, breadth first.
+        
+        Pages are processed `page_workers` at a time; each asset is downloaded
+        once for the whole crawl and shared by every page that references it.
+        """
+        self.logger.info(f"Starting to crawl: {self.base_url}")
+        
+        frontier = UrlFrontier(capacity=max(max_pages * 50, 100000))
+        frontier.add(self.base_url, 0)
+        # The site root is saved as the start page too, so never fetch it separately
+        frontier.seen.add(normalize_url(urljoin(self.base_url, '/')))
+        # Every saved page and the same-site links it points at locally, on disk
+        saved = PageLinks()
+        in_flight = {}
+        
+        try:
+            with ThreadPoolExecutor(max_workers=page_workers) as pool:
+                while len(frontier) or in_flight:
+                    while len(frontier) and len(in_flight) < page_workers and len(saved) + len(in_flight) < max_pages:
+                        url, depth = frontier.pop()
+                        in_flight[pool.submit(self._crawl_page, url, depth < max_depth)] = (url, depth)
+                    self.metrics.set_gauge('frontier', len(frontier))
+                    self.metrics.set_gauge('pages_in_flight', len(in_flight))
+                    if not in_flight:
+                        break
+                    
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, depth = in_flight.pop(future)
+                        page_links = future.result()
+                        if page_links is None:
+                            continue
+                        saved.add(self.page_path(url), url, [(self.page_path(link), link) for link in page_links])
+                        for link in page_links:
+                            frontier.add(link, depth + 1)
+            pages = len(saved)
+            self._unlink_missing_pages(saved)
+        finally:
+            frontier.close()
+            saved.close()
+        
+        if self.journal is not None:
+            self.journal.clear(self.journal_scope)
+        
+        self.logger.info(f"Crawl completed! Files saved to: {self.output_dir}")
+        
+        # Print summary
+        print(f"\nCrawl Summary:")
+        print(f"Website: {self.base_url}")
+        print(f"Output directory: {self.output_dir}")
+        print(f"Pages mirrored: {pages}")
+        print(f"Assets referenced: {len(self._assets)}")
+        print(f"Main HTML saved as: index.html")
+        self._save_metrics()
+    
+    def _unlink_missing_pages(self, saved):
+        """Point links to pages the crawl never saved (past max_pages, failed, not HTML) back at the site.
+        
+        Pages are written with every same-site link pointing at where its
+        target would be saved, before it is known whether it will be; only
+        the pages with a link to a missing one are parsed again.
+        """
+        for html_path, url, links in saved.missing():
+            page_dir = posixpath.dirname(html_path) or '.'
+            missing = {posixpath.relpath(target, page_dir): link for target, link in links}
+            local_html_path = os.path.join(self.output_dir, html_path)
+            with open(local_html_path, encoding='utf-8') as f:
+                html = f.read()
+            with self.metrics.timer('rewrite'):
+                html = self.parser.run(unlink_pages, html, missing)
+            with self.metrics.timer('write'):
+                with open(local_html_path, 'w', encoding='utf-8') as f:
+                    f.write(html)
+            self.logger.info(f"Linked {html_path} to the live site for {len(missing)} pages that were not mirrored")
+    
+    def _save_metrics(self):
+        """Print the per-stage timings and save the full run metrics as JSON"""
+        path = os.path.join(self.output_dir, 'metrics.json')
+        self.metrics.write_json(path)
+        print(f"\n{self.metrics.report()}")
+        print(f"Run metrics saved to {path}")
 
 def main():
     """Main function to run the scraper"""
@@ -257,11 +525,20 @@ def main():
     if not output_dir:
         output_dir = "scraped_website"
     
+    # Whole-site mirroring is optional
+    crawl = input("Mirror the whole site? (y/n, default n): ").strip().lower() == 'y'
+    max_pages = 100
+    if crawl:
+        max_pages = int(input("Maximum pages to mirror (default 100): ") or "100")
+    
     # Create scraper instance and run
     scraper = WebsiteScraper(url, output_dir)
     
     try:
-        scraper.scrape_website()
+        if crawl:
+            scraper.crawl_website(max_pages=max_pages)
+        else:
+            scraper.scrape_website()
         print(f"\nScraping completed successfully!")
         print(f"Open '{output_dir}/index.html' in your browser to view the scraped website.")
     except Exception as e:
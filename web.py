@@ -1,29 +1,132 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
 
-def fetch_html(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        print(f"Error fetching URL: {e}")
-        return None
+from bs4 import BeautifulSoup, SoupStrainer
+
+from parsing import ParsePool
+from simhash import SimHashIndex, simhash
+from sources import fetch_html, iter_sources, load_html, parse_sources
+
+LAYOUT_TAGS = ['header', 'nav', 'main', 'section', 'article', 'aside', 'footer']
+
+# Only layout elements (and whatever they contain) are built into the tree
+LAYOUT_ONLY = SoupStrainer(LAYOUT_TAGS)
+
+def _layout_elements(html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=LAYOUT_ONLY)
+    return soup.find_all(LAYOUT_TAGS)
+
+def _describe(el):
+    return f"<{el.name}> - {el.get('id') or el.get('class') or 'no identifier'}"
+
+def _by_tag(elements):
+    # Listed tag by tag (all headers, then all navs, ...) as before
+    return sorted(elements, key=lambda el: LAYOUT_TAGS.index(el.name))
 
 def extract_layout(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    layout_tags = ['header', 'nav', 'main', 'section', 'article', 'aside', 'footer']
-    layout = []
-
-    for tag in layout_tags:
-        elements = soup.find_all(tag)
-        for el in elements:
-            layout.append(f"<{tag}> - {el.get('id') or el.get('class') or 'no identifier'}")
-    
-    return layout
+    # One search for all layout tags instead of one per tag
+    return [_describe(el) for el in _by_tag(_layout_elements(html))]
 
-def main():
+def layout_fingerprint(html):
+    """Structural fingerprint of a page, from its layout elements only.
+
+    Every element contributes its path of layout ancestors (body>header>nav),
+    the path with its id and the path with each of its classes. `digest`
+    identifies the exact skeleton; `simhash` is close for similar ones, so
+    pages built from the same template land within a few bits of each other.
+    """
+    elements = _layout_elements(html)
+    features = Counter()
+    skeleton = []
+    for el in elements:
+        path = '>'.join([parent.name for parent in reversed(list(el.find_parents(LAYOUT_TAGS)))] + [el.name])
+        features[path] += 1
+        if el.get('id'):
+            features[f"{path}#{el['id']}"] += 1
+        for cls in el.get('class') or []:
+            features[f"{path}.{cls}"] += 1
+        skeleton.append(f"{path}#{el.get('id') or ''}.{'.'.join(el.get('class') or [])}")
+    return {
+        'layout': [_describe(el) for el in _by_tag(elements)],
+        'elements': len(elements),
+        'digest': hashlib.sha1('\n'.join(skeleton).encode('utf-8')).hexdigest(),
+        'simhash': simhash(features) if features else 0,
+    }
+
+class LayoutIndex(SimHashIndex):
+    """On-disk index of layout fingerprints by source (URL or file path)"""
+
+    def __init__(self, path):
+        super().__init__(path, table='layouts')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS layout_details (
+            source TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            elements INTEGER NOT NULL,
+            layout TEXT NOT NULL
+        )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS layout_details_digest ON layout_details (digest)')
+        self._db.commit()
+
+    def add_page(self, record):
+        self.add(record['source'], record['simhash'])
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO layout_details (source, digest, elements, layout) '
+                             'VALUES (?, ?, ?, ?)',
+                             (record['source'], record['digest'], record['elements'], json.dumps(record['layout'])))
+            self._db.commit()
+
+    def similar(self, record, max_distance=3, limit=10):
+        """[(source, distance)] of indexed pages with the same or a similar layout, closest first"""
+        with self._lock:
+            same = [row[0] for row in self._db.execute('SELECT source FROM layout_details WHERE digest = ? LIMIT ?',
+                                                       (record['digest'], limit))]
+        matches = [(source, 0) for source in same]
+        for source, distance in self.near(record['simhash'], max_distance, limit):
+            if source not in same:
+                matches.append((source, distance))
+        return [match for match in matches if match[0] != record.get('source')][:limit]
+
+def batch(args):
+    index = LayoutIndex(args.index)
+    parser = ParsePool(args.parse_workers)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    pages = failed = 0
+    try:
+        for source, record in parse_sources(iter_sources(args.inputs), layout_fingerprint, parser, args.workers):
+            if record is None:
+                failed += 1
+                continue
+            record['source'] = source
+            # Group each page with the closest template already indexed
+            matches = index.similar(record, args.max_distance, limit=1)
+            record['similar_to'] = matches[0][0] if matches else None
+            index.add_page(record)
+            out.write(json.dumps(dict(record, simhash=f"{record['simhash']:016x}")) + '\n')
+            pages += 1
+    finally:
+        parser.close()
+        index.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"Fingerprinted {pages} pages ({failed} failed); index: {args.index}", file=sys.stderr)
+
+def similar(args):
+    index = LayoutIndex(args.index)
+    try:
+        html = load_html(args.source)
+        if html is None:
+            return
+        record = layout_fingerprint(html)
+        record['source'] = args.source
+        for source, distance in index.similar(record, args.max_distance, args.limit):
+            print(f"{distance:>3}  {source}")
+    finally:
+        index.close()
+
+def interactive():
     url = input("Enter a URL: ")
     html = fetch_html(url)
 
@@ -35,5 +138,30 @@ def main():
     else:
         print("Failed to retrieve or parse the page.")
 
+def main():
+    if len(sys.argv) == 1:
+        interactive()
+        return
+
+    parser = argparse.ArgumentParser(description="Fingerprint page layouts and find sites built from the same template")
+    commands = parser.add_subparsers(dest='command', required=True)
+    batch_parser = commands.add_parser('batch', help='fingerprint many pages and add them to the index')
+    batch_parser.add_argument('inputs', nargs='+', help='URLs, .html files, directories, or files listing them')
+    batch_parser.add_argument('-o', '--output', help='write JSON Lines here instead of stdout')
+    batch_parser.add_argument('-w', '--workers', type=int, default=16, help='fetch threads')
+    batch_parser.add_argument('--parse-workers', type=int, default=None,
+                              help='parse processes (default: one per core, 0: parse in-thread)')
+    similar_parser = commands.add_parser('similar', help='list indexed pages with a layout like this one')
+    similar_parser.add_argument('source', help='URL or .html file')
+    similar_parser.add_argument('-n', '--limit', type=int, default=10)
+    for sub in (batch_parser, similar_parser):
+        sub.add_argument('--index', default='layouts.sqlite', help='layout index database')
+        sub.add_argument('--max-distance', type=int, default=3, help='SimHash bits two similar layouts may differ in')
+    args = parser.parse_args()
+    if args.command == 'batch':
+        batch(args)
+    else:
+        similar(args)
+
 if __name__ == "__main__":
     main()
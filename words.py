@@ -1,23 +1,173 @@
+import argparse
+import json
+import re
+import sys
+from collections import Counter, deque
+
 import requests
 from bs4 import BeautifulSoup
-import re
+
+from parsing import ParsePool
+from sources import iter_sources, parse_sources
+
+WORD = re.compile(r'\b\w+\b')
+
+# Parse-only half of extract_words_from_page: plain text in, plain list out,
+# so it can run in a worker process (see parsing.ParsePool)
+def extract_words(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    text = soup.get_text()
+    return WORD.findall(text)
 
 # Function to extract words from a webpage
 def extract_words_from_page(url):
-    response = requests.get(url)
+    response = requests.get(url, timeout=15)
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = soup.get_text()
-        words = re.findall(r'\b\w+\b', text)
-        return words
+        return extract_words(response.text)
     else:
         print("Failed to retrieve the page.")
         return []
 
-# Take URL input from the user
-url = input("Enter the URL of the webpage: ")
-words = extract_words_from_page(url)
+def iter_words(text, lowercase=True):
+    """Words of a text one at a time, without building a list of them"""
+    for match in WORD.finditer(text):
+        word = match.group()
+        yield word.lower() if lowercase else word
+
+def document_counts(html, ngram=2, lowercase=True):
+    """Word and n-gram counts of one page (the corpus job run in worker processes)"""
+    text = BeautifulSoup(html, 'html.parser').get_text(' ')
+    words = Counter()
+    grams = Counter()
+    window = deque(maxlen=ngram)
+    for word in iter_words(text, lowercase):
+        words[word] += 1
+        if ngram > 1:
+            window.append(word)
+            if len(window) == ngram:
+                grams[' '.join(window)] += 1
+    return {'words': sum(words.values()), 'counts': words, 'ngrams': grams}
+
+class BoundedCounter:
+    """Counter merges that never hold much more than max_terms entries.
+
+    Once the counter passes twice max_terms it is cut back to the max_terms
+    most frequent entries. Terms that are frequent across the corpus survive
+    every cut, so the top of the ranking stays right while memory stays
+    bounded; counts of rarer terms become lower bounds once `pruned` is set.
+    """
+
+    def __init__(self, max_terms=200000):
+        self.max_terms = max_terms
+        self.counts = Counter()
+        self.pruned = 0
+
+    def update(self, counts):
+        self.counts.update(counts)
+        if len(self.counts) > 2 * self.max_terms:
+            self.counts = Counter(dict(self.counts.most_common(self.max_terms)))
+            self.pruned += 1
+
+    def most_common(self, n):
+        return self.counts.most_common(n)
+
+    def __len__(self):
+        return len(self.counts)
+
+class Corpus:
+    """Running word and n-gram frequencies over many documents, merged one document at a time"""
+
+    def __init__(self, max_terms=200000):
+        self.documents = 0
+        self.total_words = 0
+        self.words = BoundedCounter(max_terms)
+        self.ngrams = BoundedCounter(max_terms)
+        self.document_frequency = BoundedCounter(max_terms)
+
+    def add(self, counts):
+        self.documents += 1
+        self.total_words += counts['words']
+        self.words.update(counts['counts'])
+        self.ngrams.update(counts['ngrams'])
+        # How many documents each word appears in
+        self.document_frequency.update(dict.fromkeys(counts['counts'], 1))
+
+    def summary(self, top=20):
+        return {
+            'documents': self.documents,
+            'words': self.total_words,
+            'unique_words': len(self.words),
+            'approximate': bool(self.words.pruned or self.ngrams.pruned or self.document_frequency.pruned),
+            'mean_words_per_document': round(self.total_words / self.documents, 1) if self.documents else 0,
+            'top_words': self.words.most_common(top),
+            'top_ngrams': self.ngrams.most_common(top),
+            'widest_spread': self.document_frequency.most_common(top),
+        }
+
+def corpus(args):
+    result = Corpus(args.max_terms)
+    parser = ParsePool(args.parse_workers)
+    per_doc = open(args.per_document, 'w', encoding='utf-8') if args.per_document else None
+    failed = 0
+    try:
+        for source, counts in parse_sources(iter_sources(args.inputs), document_counts, parser, args.workers,
+                                            args.ngram, not args.keep_case):
+            if counts is None:
+                failed += 1
+                continue
+            result.add(counts)
+            if per_doc is not None:
+                per_doc.write(json.dumps({'source': source, 'words': counts['words'],
+                                          'unique_words': len(counts['counts']),
+                                          'top_words': counts['counts'].most_common(10)}) + '\n')
+    finally:
+        parser.close()
+        if per_doc is not None:
+            per_doc.close()
+
+    summary = result.summary(args.top)
+    summary['failed'] = failed
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"{summary['documents']} documents, {summary['words']} words, {summary['unique_words']} unique"
+          f"{' (approximate)' if summary['approximate'] else ''}, {failed} failed")
+    print(f"\nTop {args.top} words:")
+    for word, count in summary['top_words']:
+        print(f"{count:>10}  {word}")
+    if args.ngram > 1:
+        print(f"\nTop {args.top} {args.ngram}-grams:")
+        for gram, count in summary['top_ngrams']:
+            print(f"{count:>10}  {gram}")
+
+def interactive():
+    # Take URL input from the user
+    url = input("Enter the URL of the webpage: ")
+    words = extract_words_from_page(url)
+
+    # Display the extracted words
+    print("\nExtracted words from the page:")
+    print(words)
+
+def main():
+    if len(sys.argv) == 1:
+        interactive()
+        return
+
+    parser = argparse.ArgumentParser(description="Word and n-gram frequencies over many pages")
+    parser.add_argument('inputs', nargs='+', help='URLs, .html files, directories (e.g. a mirror), or files listing them')
+    parser.add_argument('-n', '--top', type=int, default=20, help='words and n-grams to list')
+    parser.add_argument('-g', '--ngram', type=int, default=2, help='n-gram length (1 to skip n-grams)')
+    parser.add_argument('-o', '--output', help='write the corpus summary as JSON here')
+    parser.add_argument('--per-document', help='write per-document stats as JSON Lines here')
+    parser.add_argument('--keep-case', action='store_true', help='count Word and word separately')
+    parser.add_argument('--max-terms', type=int, default=200000,
+                        help='distinct words/n-grams kept in memory (rarer ones are pruned)')
+    parser.add_argument('-w', '--workers', type=int, default=16, help='fetch threads')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='parse processes (default: one per core, 0: parse in-thread)')
+    corpus(parser.parse_args())
 
-# Display the extracted words
-print("\nExtracted words from the page:")
-print(words)
\ No newline at end of file
+if __name__ == "__main__":
+    main()